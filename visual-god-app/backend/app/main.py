@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Header, Request, Response, UploadFile, File, Form
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Optional
@@ -6,6 +7,7 @@ import os
 import sys
 import logging
 import asyncio
+import zipfile
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,12 +18,111 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import your enhanced content agent
 try:
-    from services.content_agent_helper import agent
+    from services.content_agent_helper import agent, generation_concurrency, plan_generation_size
     logger.info("Enhanced content agent imported successfully")
 except ImportError as e:
     logger.error(f"Failed to import content agent: {e}")
     raise
 
+from services import metrics
+from services.single_flight import SingleFlight, request_digest
+from services.idempotency import IdempotencyStore, IdempotencyConflict
+from services.image_encoding import (
+    DEFAULT_OUTPUT_FORMAT, DEFAULT_ENCODE_PRESET, ENCODE_PRESETS, available_formats
+)
+from services.rendition_store import rendition_store
+from services.bulk_ingest import BulkIngestor, BULK_MAX_ITEMS
+from services.styles import STYLE_REGISTRY, resolve_styles, describe_styles
+from services.admission import AdmissionController, AdmissionRejected
+from services.circuit_breaker import CircuitOpenError, vision_breaker, image_edit_breaker, breaker_states
+from services.tracing import span, parse_trace_headers
+from services.memory_profiler import memory_profile, profiling_requested, recent_profiles, rss_bytes, token_valid, MEMORY_PROFILING
+from services.json_stream import iter_json
+
+RESPONSE_MODES = ["full", "preview"]
+# Stream /api/process results instead of validating and encoding them in one piece
+STREAM_PROCESS_RESPONSES = os.getenv("STREAM_PROCESS_RESPONSES", "1") == "1"
+PIPELINE_MODES = ["staged", "pipelined"]
+# Response deadline for /api/generate-only (2 minutes)
+GENERATE_TIMEOUT_SECONDS = float(os.getenv("GENERATE_TIMEOUT_SECONDS", "120"))
+
+# Identical concurrent /api/process calls (double-clicks, retries) share one run
+process_flight = SingleFlight("process")
+generate_flight = SingleFlight("generate")
+
+# Completed responses replayed for repeated Idempotency-Key headers
+idempotency_store = IdempotencyStore()
+
+# Caps image generations in flight; waiting users are served round-robin
+admission = AdmissionController()
+
+# Catalog jobs run product by product through the same agent pipeline and admission control
+bulk_ingestor = BulkIngestor(agent.process, admission)
+
+def check_encoding(output_format: str, encode_preset: str) -> None:
+    """Reject output formats/presets this Pillow build cannot encode"""
+    if output_format not in available_formats():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid output_format. Must be one of: {available_formats()}"
+        )
+    if encode_preset not in ENCODE_PRESETS[output_format]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid encode_preset. Must be one of: {list(ENCODE_PRESETS[output_format].keys())}"
+        )
+
+def check_response_mode(response_mode: str) -> None:
+    if response_mode not in RESPONSE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid response_mode. Must be one of: {RESPONSE_MODES}"
+        )
+
+def replay_idempotent(response: Response, scoped_key: str, fingerprint: str) -> Optional[Dict]:
+    """Return the stored response for a repeated Idempotency-Key, if any"""
+    try:
+        replay = idempotency_store.lookup(scoped_key, fingerprint)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if replay is not None:
+        logger.info("Replaying stored response for repeated Idempotency-Key")
+        response.headers["Idempotent-Replayed"] = "true"
+    return replay
+
+def admission_rejected_response(e: AdmissionRejected) -> JSONResponse:
+    """Fast 429 telling the client when capacity is likely to free up"""
+    logger.warning(f"Admission rejected ({e.reason}), retry after {e.retry_after}s")
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(e.retry_after)},
+        content={
+            "success": False,
+            "error": f"{e.reason}. Please retry in about {e.retry_after} seconds.",
+            "retry_after": e.retry_after,
+            "queue_position": e.queue_position,
+            "queue_length": e.queue_length
+        }
+    )
+
+def reject_if_open(breaker) -> None:
+    """503 in milliseconds instead of waiting out the upstream timeout"""
+    try:
+        breaker.check()
+    except CircuitOpenError as e:
+        logger.warning(f"Rejecting request: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def parse_fields(raw) -> Optional[List[str]]:
+    """Field selection as a list of names or a comma-separated string"""
+    if raw is None or raw == "" or raw == []:
+        return None
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, list) or not all(isinstance(f, str) for f in raw):
+        raise HTTPException(status_code=400, detail="fields must be a list of field names or a comma-separated string")
+    return [f.strip() for f in raw if f.strip()] or None
+
 app = FastAPI(
     title="Visual God API",
     description="AI-powered content generation with image creation",
@@ -33,9 +134,13 @@ async def validate_images(request: dict):
     """
     Validate and categorize uploaded images without generating
     """
+    reject_if_open(vision_breaker)
+    fields = parse_fields(request.get('fields'))
     try:
         images = request.get('images', [])
         user_id = request.get('userId')
+        # Compact mode refers to images by index/digest instead of echoing base64
+        compact = bool(request.get('compact', False))
         
         logger.info(f"Validating {len(images)} images for user {user_id}")
         
@@ -52,7 +157,7 @@ async def validate_images(request: dict):
         ]
         
         # Use agent's validate_images method
-        result = agent.validate_images(images_data)
+        result = await asyncio.to_thread(agent.validate_images, images_data, compact=compact, fields=fields)
         
         logger.info(f"Validation completed: {result.get('message', 'Unknown result')}")
         
@@ -78,6 +183,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Root span per request; the trace id comes from X-Trace-Id / traceparent or is generated"""
+    if request.url.path == "/health":
+        return await call_next(request)
+    trace_id, parent_span_id = parse_trace_headers(request.headers.get("traceparent"), request.headers.get("x-trace-id"))
+    with span(f"{request.method} {request.url.path}", parent={"trace_id": trace_id, "span_id": parent_span_id}) as request_span:
+        response = await call_next(request)
+        if request_span is not None:
+            request_span.set(**{"http.status_code": response.status_code})
+    response.headers["X-Trace-Id"] = trace_id
+    return response
+
 # 🎯 UPDATED: New size configurations
 SIZE_CONFIGS = {
     "instagram": {
@@ -112,12 +230,22 @@ class ProcessRequest(BaseModel):
     generate_images: bool = True
     image_size: str = "instagram"  # New field for size selection
     sessionId: Optional[str] = None
+    dedupe_threshold: Optional[int] = None  # Max dHash distance for near-duplicates; setting it opts in (None = server default, off)
+    output_format: str = DEFAULT_OUTPUT_FORMAT  # jpeg, progressive_jpeg, webp or avif
+    encode_preset: str = DEFAULT_ENCODE_PRESET  # fast, balanced, small or max
+    response_mode: str = "full"  # "preview" returns thumbnails; full images via GET /api/images/{id}
+    styles: Optional[List[str]] = None  # Style ids or aliases from /api/styles (None = all styles)
+    pipeline_mode: Optional[str] = None  # "staged" or "pipelined" (None = server default)
 
 class GenerateRequest(BaseModel):
     prompts: List[str]
     images: List[ImageData]
     max_images: int = 3
     image_size: str = "instagram"  # New field for size selection
+    output_format: str = DEFAULT_OUTPUT_FORMAT
+    encode_preset: str = DEFAULT_ENCODE_PRESET
+    response_mode: str = "full"
+    userId: Optional[str] = None  # Used for fair queueing under load
 
 # Response models
 class ProductInfo(BaseModel):
@@ -127,13 +255,27 @@ class ProductInfo(BaseModel):
 
 class GeneratedImage(BaseModel):
     prompt: str
-    image_base64: str
+    image_base64: Optional[str] = None  # Omitted in preview mode
+    preview_base64: Optional[str] = None
+    image_id: Optional[str] = None
     image_url: Optional[str] = None
     index: int
     input_image: Optional[str] = None
     size: Optional[str] = None
     product_name: Optional[str] = None
     prompt_type: Optional[str] = None
+    mime_type: Optional[str] = None  # Of the full rendition (image_base64 / image_url)
+    preview_mime_type: Optional[str] = None  # Of preview_base64
+
+class DuplicateImage(BaseModel):
+    index: int
+    filename: Optional[str] = None
+    distance: int
+
+class DuplicateGroup(BaseModel):
+    kept_index: int
+    kept_filename: Optional[str] = None
+    merged: List[DuplicateImage]
 
 class ProcessResponse(BaseModel):
     success: bool
@@ -146,6 +288,10 @@ class ProcessResponse(BaseModel):
     generated_images: Optional[List[GeneratedImage]] = None
     message: Optional[str] = None
     session_id: Optional[str] = None
+    duplicates_merged: Optional[List[DuplicateGroup]] = None  # Upload indices folded into each kept one
+    degraded: Optional[str] = None  # Set when generation was skipped because the image API is unavailable
+    coalesced: Optional[bool] = None  # True when this response was shared from an identical in-flight request
+    memory_profile: Optional[Dict] = None  # Per-stage memory when profiling is on (X-Profile-Memory with MEMORY_PROFILING_TOKEN, or MEMORY_PROFILING)
 
 @app.get("/")
 def read_root():
@@ -156,20 +302,93 @@ def read_root():
         "features": [
             "Product-only processing",
             "Product scanning", 
-            "AI prompt generation (3 styles per product)",
+            f"AI prompt generation (up to {len(STYLE_REGISTRY)} selectable styles per product)",
             "Multi-platform image generation",
             "Instagram Reels, Facebook Ads, YouTube Banners"
         ],
         "supported_sizes": SIZE_CONFIGS
     }
 
+def _pick(data: Dict, model) -> Dict:
+    """The model's fields from data, with defaults for absent optional ones, as model_dump() emits them"""
+    return {
+        k: data[k] if k in data else field.get_default(call_default_factory=True)
+        for k, field in model.model_fields.items()
+        if k in data or not field.is_required()
+    }
+
+def shape_process_response(result: Dict) -> Dict:
+    """Keep the ProcessResponse fields without re-validating; image strings are shared, not copied"""
+    shaped = _pick(result, ProcessResponse)
+    if shaped.get("generated_images"):
+        shaped["generated_images"] = [_pick(img, GeneratedImage) for img in shaped["generated_images"]]
+    if shaped.get("products"):
+        shaped["products"] = [_pick(p, ProductInfo) for p in shaped["products"]]
+    if shaped.get("duplicates_merged"):
+        shaped["duplicates_merged"] = [
+            {**_pick(g, DuplicateGroup), "merged": [_pick(m, DuplicateImage) for m in g.get("merged", [])]}
+            for g in shaped["duplicates_merged"]
+        ]
+    return shaped
+
+def stream_process_response(result: Dict, response: Response):
+    """Stream generated_images one at a time; falls back to the validated response_model path"""
+    if not STREAM_PROCESS_RESPONSES:
+        return result
+    # Returning a Response bypasses the injected one, so carry its headers over
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    return StreamingResponse(iter_json(shape_process_response(result)), media_type="application/json", headers=headers)
+
 @app.post("/api/process", response_model=ProcessResponse)
-async def process_images(request: ProcessRequest):
+async def process_images(
+    request: ProcessRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    profile_memory: Optional[str] = Header(None, alias="X-Profile-Memory")
+):
     """
     Process uploaded images and optionally generate new images with specified size
     """
     try:
-        logger.info(f"Processing {len(request.images)} images (generate_images={request.generate_images}, size={request.image_size})")
+        style_ids = resolve_styles(request.styles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if request.pipeline_mode is not None and request.pipeline_mode not in PIPELINE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid pipeline_mode. Must be one of: {PIPELINE_MODES}"
+        )
+
+    # Fingerprint what the client asked for, so a retry after a degraded run matches its key
+    fingerprint = request_digest(
+        [img.model_dump() for img in request.images],
+        generate_images=request.generate_images,
+        image_size=request.image_size,
+        dedupe_threshold=request.dedupe_threshold,
+        output_format=request.output_format,
+        encode_preset=request.encode_preset,
+        response_mode=request.response_mode,
+        styles=style_ids
+    )
+    check_encoding(request.output_format, request.encode_preset)
+    check_response_mode(request.response_mode)
+    scoped_key = f"process:{request.userId}:{idempotency_key}" if idempotency_key else None
+    if scoped_key:
+        replay = replay_idempotent(response, scoped_key, fingerprint)
+        if replay is not None:
+            return stream_process_response(replay, response)
+
+    # Without vision nothing useful can run; without image edits fall back to validate-only
+    reject_if_open(vision_breaker)
+    generate_images = request.generate_images
+    degraded = None
+    if generate_images and image_edit_breaker.is_open():
+        logger.warning("Image edit circuit open, degrading to validation only")
+        generate_images = False
+        degraded = "image_generation_unavailable"
+
+    try:
+        logger.info(f"Processing {len(request.images)} images (generate_images={generate_images}, size={request.image_size})")
         
         # Validate size parameter
         if request.image_size not in SIZE_CONFIGS:
@@ -184,25 +403,51 @@ async def process_images(request: ProcessRequest):
             for img in request.images
         ]
         
+        # Slots match the images.edit calls the run actually has in flight (validation-only costs one)
+        cost = generation_concurrency(len(images_data) * len(style_ids), request.pipeline_mode) if generate_images else 1
+
         # Wrapper function with timeout handling
+        async def run_agent():
+            # Only the single-flight leader takes slots; attached callers wait on it
+            async with admission.admit(request.userId, cost):
+                try:
+                    with memory_profile("process", enabled=profiling_requested(profile_memory)) as profile:
+                        # Run off the event loop so concurrent requests can overlap
+                        result = await asyncio.to_thread(
+                            agent.process,
+                            images_data, 
+                            generate_images=generate_images,
+                            image_size=request.image_size,
+                            dedupe_threshold=request.dedupe_threshold,
+                            output_format=request.output_format,
+                            encode_preset=request.encode_preset,
+                            response_mode=request.response_mode,
+                            styles=style_ids,
+                            pipeline_mode=request.pipeline_mode
+                        )
+                    if profile is not None:
+                        result["memory_profile"] = profile.report()
+                    return result
+                except Exception as e:
+                    logger.error(f"Agent processing error: {e}")
+                    return {
+                        "success": False,
+                        "error": f"Processing failed: {str(e)}",
+                        "descriptions": [],
+                        "products": [],
+                        "prompts": [],
+                        "generated_images": []
+                    }
+
         async def safe_process():
-            try:
-                result = agent.process(
-                    images_data, 
-                    generate_images=request.generate_images,
-                    image_size=request.image_size
-                )
-                return result
-            except Exception as e:
-                logger.error(f"Agent processing error: {e}")
-                return {
-                    "success": False,
-                    "error": f"Processing failed: {str(e)}",
-                    "descriptions": [],
-                    "products": [],
-                    "prompts": [],
-                    "generated_images": []
-                }
+            # Scoped per user so each user's run is admitted and queued on its own;
+            # a degraded run must not be shared with callers that still get to generate
+            flight_key = f"{request.userId}:{fingerprint}" + (f":{degraded}" if degraded else "")
+            result, coalesced = await process_flight.do(flight_key, run_agent)
+            if coalesced:
+                logger.info("Attached to an identical in-flight request")
+                result["coalesced"] = True
+            return result
         
         # Set timeout UNDER Railway's limit (3 minutes vs 4 minute Railway limit)
         try:
@@ -224,8 +469,14 @@ async def process_images(request: ProcessRequest):
             # Add session ID if provided
             if request.sessionId:
                 result["session_id"] = request.sessionId
+
+            if degraded:
+                result["degraded"] = degraded
+            # A degraded run is not what the key asked for; let a later retry generate
+            elif scoped_key and result.get("success"):
+                idempotency_store.save(scoped_key, fingerprint, result)
             
-            return result
+            return stream_process_response(result, response)
             
         except asyncio.TimeoutError:
             logger.error("Processing timed out after 3 minutes")
@@ -239,6 +490,8 @@ async def process_images(request: ProcessRequest):
                 "message": "⏰ Timeout - please try again with fewer images"
             }
         
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         return {
@@ -251,10 +504,34 @@ async def process_images(request: ProcessRequest):
         }
 
 @app.post("/api/generate-only")
-async def generate_images_only(request: GenerateRequest):
+async def generate_images_only(
+    request: GenerateRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    profile_memory: Optional[str] = Header(None, alias="X-Profile-Memory")
+):
     """
     Generate images from provided prompts and input images using GPT-Image-1
     """
+    fingerprint = request_digest(
+        [img.model_dump() for img in request.images],
+        prompts=request.prompts,
+        max_images=request.max_images,
+        image_size=request.image_size,
+        output_format=request.output_format,
+        encode_preset=request.encode_preset,
+        response_mode=request.response_mode
+    )
+    check_encoding(request.output_format, request.encode_preset)
+    check_response_mode(request.response_mode)
+    scoped_key = f"generate:{request.userId}:{idempotency_key}" if idempotency_key else None
+    if scoped_key:
+        replay = replay_idempotent(response, scoped_key, fingerprint)
+        if replay is not None:
+            return replay
+    # A stored result can be replayed even while the upstream is down
+    reject_if_open(image_edit_breaker)
+
     try:
         logger.info(f"Generating images for {len(request.prompts)} prompts with {len(request.images)} input images (size={request.image_size})")
         
@@ -277,25 +554,49 @@ async def generate_images_only(request: GenerateRequest):
                 detail="Input images are required for GPT-Image-1"
             )
         
+        # generate-only runs its edits one after another
+        cost = generation_concurrency(min(len(request.prompts), request.max_images), "staged")
+        profile_reports: List[Dict] = []
+
         # Wrapper with timeout
+        async def run_generation():
+            async with admission.admit(request.userId, cost):
+                with memory_profile("generate-only", enabled=profiling_requested(profile_memory)) as profile:
+                    generated = await asyncio.to_thread(
+                        agent.generate_images,
+                        request.prompts, 
+                        images_data, 
+                        max_images=request.max_images,
+                        image_size=request.image_size,
+                        output_format=request.output_format,
+                        encode_preset=request.encode_preset,
+                        response_mode=request.response_mode
+                    )
+                if profile is not None:
+                    profile_reports.append(profile.report())
+                return generated
+
         async def generate_with_timeout():
             try:
-                generated_images = agent.generate_images(
-                    request.prompts, 
-                    images_data, 
-                    max_images=request.max_images,
-                    image_size=request.image_size
-                )
+                # A retry with the same key attaches to the run still in flight
+                if scoped_key:
+                    generated_images, _ = await generate_flight.do(scoped_key, run_generation, fingerprint)
+                else:
+                    # Shielded like the single-flight path: a timeout cannot stop the edits
+                    # running in their thread, so their slots stay taken until they finish
+                    generated_images = await asyncio.shield(asyncio.ensure_future(run_generation()))
                 return generated_images
             except asyncio.TimeoutError:
                 logger.error("Image generation timed out")
                 return []
+            except (AdmissionRejected, IdempotencyConflict):
+                raise
             except Exception as e:
                 logger.error(f"Image generation error: {str(e)}")
                 raise
         
         try:
-            generated_images = await asyncio.wait_for(generate_with_timeout(), timeout=120.0)  # 2 minutes for generation only
+            generated_images = await asyncio.wait_for(generate_with_timeout(), timeout=GENERATE_TIMEOUT_SECONDS)
             
             # Add size info to generated images
             size_config = SIZE_CONFIGS[request.image_size]
@@ -312,14 +613,26 @@ async def generate_images_only(request: GenerateRequest):
                 "message": "Generation timed out - try fewer images"
             }
         
-        return {
+        result = {
             "success": True,
             "generated_images": generated_images,
             "total_generated": len(generated_images),
             "message": f"Generated {len(generated_images)} images using GPT-Image-1 in {SIZE_CONFIGS[request.image_size]['size']} format",
             "image_format": SIZE_CONFIGS[request.image_size]["label"]
         }
+        if profile_reports:
+            result["memory_profile"] = profile_reports[0]
+
+        # Empty batches are failures in disguise; let the retry run again
+        if scoped_key and generated_images:
+            idempotency_store.save(scoped_key, fingerprint, result)
+
+        return result
         
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Image generation error: {str(e)}")
         raise HTTPException(
@@ -330,6 +643,114 @@ async def generate_images_only(request: GenerateRequest):
             }
         )
 
+@app.get("/api/images/{image_id}")
+async def get_full_image(image_id: str):
+    """
+    Full-resolution rendition of a preview-mode image, encoded on first request
+    """
+    rendition = await asyncio.to_thread(rendition_store.get, image_id)
+    if rendition is None:
+        raise HTTPException(status_code=404, detail="Image not found or expired")
+    content, media_type = rendition
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
+
+@app.post("/api/bulk", status_code=202)
+async def start_bulk_ingestion(
+    archive: Optional[UploadFile] = File(None),
+    manifest: Optional[UploadFile] = File(None),
+    userId: Optional[str] = Form(None),
+    generate_images: bool = Form(True),
+    image_size: str = Form("instagram"),
+    output_format: str = Form(DEFAULT_OUTPUT_FORMAT),
+    encode_preset: str = Form(DEFAULT_ENCODE_PRESET)
+):
+    """
+    Start a catalog ingestion job from a ZIP of product images and/or a manifest
+    (JSON or JSON lines of {filename, url?, sku?})
+    """
+    if archive is None and manifest is None:
+        raise HTTPException(status_code=400, detail="Provide a ZIP archive, a manifest, or both")
+    if image_size not in SIZE_CONFIGS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid image_size. Must be one of: {list(SIZE_CONFIGS.keys())}"
+        )
+    check_encoding(output_format, encode_preset)
+
+    try:
+        job = await bulk_ingestor.create(
+            archive_upload=archive,
+            manifest_raw=await manifest.read() if manifest is not None else None,
+            options={
+                "generate_images": generate_images,
+                "image_size": image_size,
+                "output_format": output_format,
+                "encode_preset": encode_preset
+            },
+            user_id=userId
+        )
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bulk upload: {str(e)}")
+
+    logger.info(f"Bulk job {job.job_id} created with {len(job.items)} products for user {userId}")
+    bulk_ingestor.start(job)
+    return job.summary()
+
+def get_bulk_job_or_404(job_id: str):
+    job = bulk_ingestor.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Bulk job not found")
+    return job
+
+@app.get("/api/bulk/{job_id}")
+def get_bulk_job(job_id: str):
+    """
+    Progress and throughput (products per minute) of a catalog job
+    """
+    return get_bulk_job_or_404(job_id).summary()
+
+@app.post("/api/bulk/{job_id}/resume", status_code=202)
+async def resume_bulk_job(job_id: str):
+    """
+    Resume a job from its checkpoint (pending and failed products only)
+    """
+    job = get_bulk_job_or_404(job_id)
+    bulk_ingestor.start(job)
+    return job.summary()
+
+@app.get("/api/bulk/{job_id}/manifest")
+def download_bulk_manifest(job_id: str):
+    """
+    Downloadable result manifest: per-product status, products and output files
+    """
+    job = get_bulk_job_or_404(job_id)
+    return JSONResponse(
+        content=job.manifest(),
+        headers={"Content-Disposition": f'attachment; filename="bulk-{job_id}-manifest.json"'}
+    )
+
+@app.get("/api/bulk/{job_id}/files/{filename}")
+def download_bulk_file(job_id: str, filename: str):
+    job = get_bulk_job_or_404(job_id)
+    path = os.path.join(job.outputs_dir, os.path.basename(filename))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(path)
+
+@app.get("/api/styles")
+def get_styles():
+    """
+    Registered prompt styles; pass ids or aliases as `styles` on /api/process
+    """
+    return {
+        "styles": describe_styles(),
+        "default_styles": list(STYLE_REGISTRY.keys())
+    }
+
 @app.get("/api/sizes")
 def get_supported_sizes():
     """
@@ -337,7 +758,10 @@ def get_supported_sizes():
     """
     return {
         "supported_sizes": SIZE_CONFIGS,
-        "default_size": "instagram"
+        "default_size": "instagram",
+        "output_formats": {name: list(ENCODE_PRESETS[name].keys()) for name in available_formats()},
+        "default_output_format": DEFAULT_OUTPUT_FORMAT,
+        "default_encode_preset": DEFAULT_ENCODE_PRESET
     }
 
 @app.get("/api/pricing")
@@ -345,11 +769,22 @@ def get_pricing_info():
     """
     Get current pricing information for the service
     """
+    cost_per_image = {}
+    for platform in SIZE_CONFIGS:
+        plan = plan_generation_size(platform)
+        cost = plan["estimated_cost_usd"]
+        cost_per_image[platform] = {
+            "cost": f"${cost:.3f} USD" if cost is not None else None,
+            "generation_size": plan["generation_size"],
+            "quality": plan["quality"]
+        }
     return {
         "image_generation": {
             "model": "GPT-Image-1",
-            "cost_per_image": "$0.08 USD",
-            "images_per_product": 3,
+            "cost_per_image": cost_per_image,
+            "cost_per_image_note": "Estimated per platform from the generation canvas and quality tier; styles with their own quality may differ",
+            "images_per_product": len(STYLE_REGISTRY),
+            "images_per_product_note": "One image per selected style; pass `styles` to generate fewer",
             "supported_sizes": list(SIZE_CONFIGS.keys()),
             "type": "Image editing/enhancement",
             "requires_input_image": True
@@ -357,10 +792,11 @@ def get_pricing_info():
         "processing": {
             "product_validation": "Included",
             "product_scanning": "Included", 
-            "prompt_generation": "3 unique styles per product"
+            "prompt_generation": f"{len(STYLE_REGISTRY)} unique styles per product (selectable)"
         },
         "limits": {
             "max_products_per_request": 5,
+            "max_products_per_bulk_job": BULK_MAX_ITEMS,
             "max_file_size": "10MB",
             "supported_formats": ["JPEG", "PNG", "WEBP"],
             "products_only": "No people or avatars allowed"
@@ -383,10 +819,15 @@ def health_check():
             "product_scanning": True,
             "multi_platform_generation": True,
             "gpt_image_1_generation": bool(os.getenv("OPENAI_API_KEY")),
-            "three_styles_per_product": True
+            "default_styles_per_product": len(resolve_styles(None)),
+            "style_selection": True
         },
-        "supported_formats": list(SIZE_CONFIGS.keys())
+        "supported_formats": list(SIZE_CONFIGS.keys()),
+        "coalesced_requests": metrics.get("process.coalesced"),
+        "circuit_breakers": breaker_states()
     }
+    if any(b["state"] != "closed" for b in health_status["circuit_breakers"].values()):
+        health_status["status"] = "degraded"
     
     # Check OpenAI connectivity
     if os.getenv("OPENAI_API_KEY"):
@@ -405,6 +846,50 @@ def health_check():
     
     return health_status
 
+def validation_stats() -> Dict:
+    """Parse-failure rate and average tokens per vision validation call"""
+    calls = metrics.get("validation.calls")
+
+    def per_call(name: str) -> float:
+        return round(metrics.get(name) / calls, 4) if calls else 0.0
+
+    return {
+        "calls": calls,
+        "parse_failure_rate": per_call("validation.parse_failures"),
+        "avg_prompt_tokens": per_call("validation.prompt_tokens"),
+        "avg_completion_tokens": per_call("validation.completion_tokens")
+    }
+
+@app.get("/api/debug/memory")
+def get_memory_profiles(debug_token: Optional[str] = Header(None, alias="X-Debug-Token")):
+    """
+    Current RSS and the most recent per-request memory profiles (requires MEMORY_PROFILING_TOKEN)
+    """
+    if not token_valid(debug_token):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {
+        "profiling_enabled_by_default": MEMORY_PROFILING,
+        "rss_bytes": rss_bytes(),
+        "recent_profiles": list(recent_profiles)
+    }
+
+@app.get("/api/metrics")
+def get_metrics():
+    """
+    Process-wide counters (coalesced requests etc.)
+    """
+    return {
+        "counters": metrics.snapshot(),
+        "inflight": {
+            "process": process_flight.inflight(),
+            "generate": generate_flight.inflight()
+        },
+        "idempotency_store": idempotency_store.stats(),
+        "rendition_store": rendition_store.stats(),
+        "admission": admission.stats(),
+        "validation": validation_stats()
+    }
+
 # Railway deployment
 if __name__ == "__main__":
     import uvicorn
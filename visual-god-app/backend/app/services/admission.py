@@ -0,0 +1,158 @@
+# File: visual-god-app/backend/app/services/admission.py
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from services import metrics
+from services.tracing import span
+
+# Global cap on image generations in flight across all requests
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "6"))
+# Requests allowed to wait for capacity before new arrivals get a 429
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "20"))
+# Longest a request may wait in the queue; past this it cannot finish before the deadline anyway
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "60"))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued (or waited too long)"""
+
+    def __init__(self, reason: str, retry_after: int, queue_position: Optional[int], queue_length: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.queue_position = queue_position
+        self.queue_length = queue_length
+
+
+class _Waiter:
+    def __init__(self, user: str, cost: int):
+        self.user = user
+        self.cost = cost
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class AdmissionController:
+    """Admission in front of the generation endpoints.
+
+    Requests reserve `cost` generation slots. When slots are busy they wait in
+    per-user queues that are served round-robin, so one user's batch cannot
+    starve everyone else. A full queue sheds load immediately.
+    """
+
+    def __init__(self, max_inflight: int = ADMISSION_MAX_INFLIGHT, max_queue: int = ADMISSION_MAX_QUEUE,
+                 max_wait_seconds: float = ADMISSION_MAX_WAIT_SECONDS):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self._inflight = 0
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        # Exponentially weighted average seconds a request holds its slots
+        self._avg_service_seconds = 30.0
+
+    def _waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _position(self, user: str) -> int:
+        """Round-robin position of the newest waiter of `user` (1 = next)"""
+        own = len(self._queues.get(user, ()))
+        return sum(min(len(q), own) for u, q in self._queues.items() if u != user) + own
+
+    def _retry_after(self, waiting: int) -> int:
+        return max(1, math.ceil(self._avg_service_seconds * (waiting + 1) / max(1, self.max_inflight)))
+
+    def _dispatch(self) -> None:
+        """Grant slots round-robin across users while capacity remains"""
+        while self._queues:
+            user, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if waiter.future.done():
+                queue.popleft()
+            elif self._inflight + waiter.cost <= self.max_inflight:
+                queue.popleft()
+                self._inflight += waiter.cost
+                waiter.future.set_result(True)
+            else:
+                return
+            # Served user moves to the back of the rotation
+            del self._queues[user]
+            if queue:
+                self._queues[user] = queue
+
+    async def acquire(self, user_id: Optional[str], cost: int) -> int:
+        user = user_id or "anonymous"
+        cost = min(max(cost, 1), self.max_inflight)
+        if not self._queues and self._inflight + cost <= self.max_inflight:
+            self._inflight += cost
+            metrics.incr("admission.admitted")
+            return cost
+
+        waiting = self._waiting()
+        if waiting >= self.max_queue:
+            metrics.incr("admission.rejected_queue_full")
+            raise AdmissionRejected("Server is at capacity", self._retry_after(waiting), None, waiting)
+
+        waiter = _Waiter(user, cost)
+        self._queues.setdefault(user, deque()).append(waiter)
+        position = self._position(user)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            metrics.incr("admission.rejected_wait_timeout")
+            waiting = self._waiting()
+            raise AdmissionRejected("Timed out waiting for capacity", self._retry_after(waiting), position, waiting)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        metrics.incr("admission.admitted")
+        metrics.incr("admission.admitted_after_wait")
+        return cost
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Drop a waiter that gave up; if it was granted meanwhile, hand the slots back"""
+        if waiter.future.done():
+            self._release_slots(waiter.cost)
+            return
+        waiter.future.cancel()
+        queue = self._queues.get(waiter.user)
+        if queue is not None:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.user]
+        self._dispatch()
+
+    def _release_slots(self, cost: int) -> None:
+        self._inflight -= cost
+        self._dispatch()
+
+    def release(self, cost: int, service_seconds: float) -> None:
+        self._avg_service_seconds = 0.8 * self._avg_service_seconds + 0.2 * service_seconds
+        self._release_slots(cost)
+
+    @asynccontextmanager
+    async def admit(self, user_id: Optional[str], cost: int):
+        with span("admission.wait", cost=cost) as wait_span:
+            granted = await self.acquire(user_id, cost)
+            if wait_span is not None:
+                wait_span.set(queued_requests=self._waiting(), inflight_generations=self._inflight)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(granted, time.monotonic() - started)
+
+    def stats(self) -> Dict:
+        return {
+            "inflight_generations": self._inflight,
+            "max_inflight_generations": self.max_inflight,
+            "queued_requests": self._waiting(),
+            "max_queue": self.max_queue,
+            "queued_users": len(self._queues),
+            "avg_service_seconds": round(self._avg_service_seconds, 1)
+        }
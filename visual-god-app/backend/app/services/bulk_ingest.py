@@ -0,0 +1,421 @@
+# File: visual-god-app/backend/app/services/bulk_ingest.py
+
+import asyncio
+import base64
+import ipaddress
+import json
+import os
+import socket
+import tempfile
+import time
+import uuid
+import zipfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from services import metrics
+from services.admission import AdmissionController, AdmissionRejected
+from services.circuit_breaker import image_edit_breaker, vision_breaker
+from services.content_agent_helper import generation_concurrency
+from services.image_encoding import file_extension
+from services.prescreen import PRESCREEN_MAX_BYTES
+from services.styles import STYLE_REGISTRY
+
+BULK_JOB_DIR = os.getenv("BULK_JOB_DIR", os.path.join(tempfile.gettempdir(), "visual-god-bulk"))
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "2"))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Largest product image read from an archive member or URL; bigger ones fail before they fill memory
+BULK_MAX_IMAGE_BYTES = int(os.getenv("BULK_MAX_IMAGE_BYTES", str(PRESCREEN_MAX_BYTES)))
+
+BULK_URL_MAX_REDIRECTS = int(os.getenv("BULK_URL_MAX_REDIRECTS", "5"))
+# Optional comma-separated host allowlist for manifest URLs; empty allows any public host
+BULK_URL_ALLOWED_HOSTS = {h.strip().lower() for h in os.getenv("BULK_URL_ALLOWED_HOSTS", "").split(",") if h.strip()}
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+class UnsafeURLError(ValueError):
+    """Manifest URL that may not be fetched (scheme, host or resolved address)"""
+
+
+class ImageTooLargeError(ValueError):
+    """Archive member or download larger than BULK_MAX_IMAGE_BYTES"""
+
+    def __init__(self, name: str, size: Optional[int] = None):
+        shown = f"{size // (1024 * 1024)}MB" if size is not None else "more"
+        super().__init__(f"{name} is too large ({shown}, max {BULK_MAX_IMAGE_BYTES // (1024 * 1024)}MB)")
+
+
+def _append_capped(buffer: bytearray, chunk: bytes, name: str) -> None:
+    """Running cap: headers can lie about sizes, so count what actually arrives"""
+    buffer += chunk
+    if len(buffer) > BULK_MAX_IMAGE_BYTES:
+        raise ImageTooLargeError(name)
+
+
+def _atomic_write_json(path: str, data: Any) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _parse_manifest(raw: bytes) -> List[Dict]:
+    """Manifest is a JSON array, {"items": [...]}, or JSON lines of {filename, url?, sku?}"""
+    text = raw.decode("utf-8").strip()
+    if not text:
+        return []
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    items = data.get("items", []) if isinstance(data, dict) else data
+    if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+        raise ValueError("Manifest must be a list of objects")
+    return items
+
+
+def _item_outcome(result: Dict) -> Dict:
+    """Status and error for one product's agent result.
+
+    "rejected" is reserved for images the validator judged not to be
+    products; API errors, unparseable analyses and crashes are "failed" so a
+    resume retries them.
+    """
+    if result.get("success") and result.get("products"):
+        return {"status": "completed", "error": None}
+    validation_results = result.get("validation_results") or []
+    if result.get("success") and validation_results and all(v.get("category") != "error" for v in validation_results):
+        return {
+            "status": "rejected",
+            "error": None,
+            "rejection_reason": next((v.get("rejection_reason") for v in validation_results if v.get("rejection_reason")), None)
+        }
+    errors = [msg for msg in result.get("messages") or [] if "❌" in msg]
+    return {"status": "failed", "error": result.get("error") or (errors[-1] if errors else "Processing failed")}
+
+
+async def _resolve_public_address(url: httpx.URL) -> str:
+    """Resolve url's host and return an address to connect to; every address must be public"""
+    if url.scheme not in ("http", "https"):
+        raise UnsafeURLError(f"Unsupported URL scheme: {url.scheme or 'none'}")
+    host = url.host.lower()
+    if not host:
+        raise UnsafeURLError("URL has no host")
+    if BULK_URL_ALLOWED_HOSTS and host not in BULK_URL_ALLOWED_HOSTS:
+        raise UnsafeURLError(f"Host not allowed: {host}")
+    port = url.port or (443 if url.scheme == "https" else 80)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise UnsafeURLError(f"Cannot resolve {host}: {e}")
+    addresses = [info[4][0] for info in infos]
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        # Covers private, loopback, link-local (cloud metadata), reserved and shared ranges
+        if not ip.is_global or ip.is_multicast:
+            raise UnsafeURLError(f"{host} resolves to a non-public address ({ip})")
+    return addresses[0]
+
+
+class BulkJob:
+    """One catalog ingestion; state is checkpointed to disk after every product"""
+
+    def __init__(self, job_id: str, options: Dict, items: List[Dict], user_id: Optional[str] = None):
+        self.job_id = job_id
+        self.dir = os.path.join(BULK_JOB_DIR, job_id)
+        self.user_id = user_id
+        self.options = options
+        self.items = items
+        self.status = "pending"
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.elapsed_before_resume = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def archive_path(self) -> str:
+        return os.path.join(self.dir, "archive.zip")
+
+    @property
+    def outputs_dir(self) -> str:
+        return os.path.join(self.dir, "outputs")
+
+    def counts(self) -> Dict[str, int]:
+        counts = {"total": len(self.items), "pending": 0, "completed": 0, "rejected": 0, "failed": 0}
+        for item in self.items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return counts
+
+    def elapsed_seconds(self) -> float:
+        if self.started_at is None:
+            return self.elapsed_before_resume
+        end = self.finished_at or time.time()
+        return self.elapsed_before_resume + (end - self.started_at)
+
+    def summary(self) -> Dict:
+        counts = self.counts()
+        done = counts["completed"] + counts["rejected"] + counts["failed"]
+        elapsed = self.elapsed_seconds()
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "counts": counts,
+            "progress": round(done / counts["total"], 3) if counts["total"] else 1.0,
+            "elapsed_seconds": round(elapsed, 1),
+            "products_per_minute": round(done / (elapsed / 60), 2) if elapsed > 0 else 0.0,
+            "options": self.options
+        }
+
+    def manifest(self) -> Dict:
+        return {**self.summary(), "items": self.items}
+
+    def checkpoint(self) -> None:
+        _atomic_write_json(os.path.join(self.dir, "checkpoint.json"), {
+            "job_id": self.job_id,
+            "status": self.status,
+            "user_id": self.user_id,
+            "options": self.options,
+            "items": self.items,
+            "elapsed_seconds": self.elapsed_seconds()
+        })
+
+    @classmethod
+    def load(cls, job_id: str) -> Optional["BulkJob"]:
+        path = os.path.join(BULK_JOB_DIR, job_id, "checkpoint.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        job = cls(job_id, data["options"], data["items"], data.get("user_id"))
+        job.status = data["status"]
+        job.elapsed_before_resume = data.get("elapsed_seconds", 0.0)
+        return job
+
+
+class BulkIngestor:
+    """Runs catalog jobs product by product under a shared concurrency budget"""
+
+    def __init__(self, process_fn: Callable[..., Dict], admission: AdmissionController,
+                 concurrency: int = BULK_CONCURRENCY):
+        self.process_fn = process_fn
+        # The same admission controller as the API, so catalog items queue alongside interactive requests
+        self.admission = admission
+        self.jobs: Dict[str, BulkJob] = {}
+        # Shared across jobs so several catalogs cannot multiply upstream load
+        self.budget = asyncio.Semaphore(concurrency)
+
+    def get(self, job_id: str) -> Optional[BulkJob]:
+        job = self.jobs.get(job_id)
+        if job is None and all(c.isalnum() for c in job_id):
+            job = BulkJob.load(job_id)
+            if job is not None:
+                self.jobs[job_id] = job
+        return job
+
+    async def create(self, archive_upload=None, manifest_raw: Optional[bytes] = None, options: Optional[Dict] = None,
+                     user_id: Optional[str] = None) -> BulkJob:
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(BULK_JOB_DIR, job_id)
+        os.makedirs(os.path.join(job_dir, "outputs"), exist_ok=True)
+
+        manifest_items = _parse_manifest(manifest_raw) if manifest_raw else []
+        archive_members: List[str] = []
+        if archive_upload is not None:
+            # Stream the upload to disk in chunks; members are read one at a time later
+            archive_path = os.path.join(job_dir, "archive.zip")
+            with open(archive_path, "wb") as f:
+                while chunk := await archive_upload.read(UPLOAD_CHUNK_BYTES):
+                    f.write(chunk)
+            with zipfile.ZipFile(archive_path) as archive:
+                archive_members = [
+                    info.filename for info in archive.infolist()
+                    if not info.is_dir()
+                    and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+                    and not os.path.basename(info.filename).startswith(".")
+                    and "__MACOSX" not in info.filename
+                ]
+
+        items = self._build_items(manifest_items, archive_members)
+        if not items:
+            raise ValueError("No product images found in archive or manifest")
+        if len(items) > BULK_MAX_ITEMS:
+            raise ValueError(f"Too many products ({len(items)}), max {BULK_MAX_ITEMS} per job")
+
+        job = BulkJob(job_id, options or {}, items, user_id)
+        job.checkpoint()
+        self.jobs[job_id] = job
+        return job
+
+    @staticmethod
+    def _build_items(manifest_items: List[Dict], archive_members: List[str]) -> List[Dict]:
+        members_by_name = {os.path.basename(m): m for m in archive_members}
+        items = []
+        if manifest_items:
+            for i, entry in enumerate(manifest_items):
+                filename = entry.get("filename") or os.path.basename(str(entry.get("url", ""))) or f"item_{i}"
+                member = members_by_name.get(os.path.basename(filename))
+                if member is None and not entry.get("url"):
+                    continue
+                items.append({
+                    "position": i,
+                    "filename": filename,
+                    "sku": entry.get("sku"),
+                    "source": "archive" if member else "url",
+                    "member": member,
+                    "url": entry.get("url"),
+                    "status": "pending"
+                })
+        else:
+            for i, member in enumerate(archive_members):
+                items.append({
+                    "position": i,
+                    "filename": os.path.basename(member),
+                    "sku": None,
+                    "source": "archive",
+                    "member": member,
+                    "url": None,
+                    "status": "pending"
+                })
+        return items
+
+    def start(self, job: BulkJob) -> None:
+        if job.task is not None and not job.task.done():
+            return
+        job.task = asyncio.create_task(self._run(job))
+
+    async def _run(self, job: BulkJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        job.finished_at = None
+        job.checkpoint()
+        # Degraded items were only validated; resuming generates their images
+        pending = [item for item in job.items if item["status"] in ("pending", "failed") or item.get("degraded")]
+        print(f"📦 Bulk job {job.job_id}: {len(pending)} product(s) to process")
+
+        # Redirects are followed by hand so every hop is checked by _fetch_url
+        async with httpx.AsyncClient(timeout=60.0, follow_redirects=False) as http:
+            await asyncio.gather(*(self._run_item(job, item, http) for item in pending))
+
+        job.finished_at = time.time()
+        job.status = "completed"
+        job.checkpoint()
+        summary = job.summary()
+        metrics.incr("bulk.jobs_completed")
+        print(f"✅ Bulk job {job.job_id} done: {summary['counts']} at {summary['products_per_minute']} products/min")
+
+    async def _read_item(self, job: BulkJob, item: Dict, http: httpx.AsyncClient) -> bytes:
+        if item["source"] == "archive":
+            def read_member() -> bytes:
+                with zipfile.ZipFile(job.archive_path) as archive:
+                    info = archive.getinfo(item["member"])
+                    if info.file_size > BULK_MAX_IMAGE_BYTES:
+                        raise ImageTooLargeError(item["filename"], info.file_size)
+                    data = bytearray()
+                    with archive.open(info) as member:
+                        while chunk := member.read(UPLOAD_CHUNK_BYTES):
+                            _append_capped(data, chunk, item["filename"])
+                    return bytes(data)
+            return await asyncio.to_thread(read_member)
+        return await self._fetch_url(item["url"], http)
+
+    @staticmethod
+    async def _fetch_url(url: str, http: httpx.AsyncClient) -> bytes:
+        """GET a manifest URL, refusing non-public destinations on every redirect hop"""
+        target = httpx.URL(url)
+        for _ in range(BULK_URL_MAX_REDIRECTS + 1):
+            address = await _resolve_public_address(target)
+            # Connect to the checked address so a second DNS answer cannot point elsewhere
+            request = http.build_request(
+                "GET",
+                target.copy_with(host=address),
+                headers={"Host": target.netloc.decode("ascii")},
+                extensions={"sni_hostname": target.host}
+            )
+            response = await http.send(request, stream=True)
+            try:
+                if not response.is_redirect:
+                    response.raise_for_status()
+                    declared = response.headers.get("content-length")
+                    if declared and declared.isdigit() and int(declared) > BULK_MAX_IMAGE_BYTES:
+                        raise ImageTooLargeError(url, int(declared))
+                    data = bytearray()
+                    async for chunk in response.aiter_bytes(UPLOAD_CHUNK_BYTES):
+                        _append_capped(data, chunk, url)
+                    return bytes(data)
+            finally:
+                await response.aclose()
+            target = target.join(response.headers["location"])
+        raise UnsafeURLError(f"Too many redirects (max {BULK_URL_MAX_REDIRECTS})")
+
+    async def _run_item(self, job: BulkJob, item: Dict, http: httpx.AsyncClient) -> None:
+        async with self.budget:
+            started = time.perf_counter()
+            try:
+                image_bytes = await self._read_item(job, item, http)
+                image = {"base64": base64.b64encode(image_bytes).decode("utf-8"), "filename": item["filename"]}
+                del image_bytes
+                result, degraded = await self._process(job, image)
+                outputs = self._save_outputs(job, item, result.get("generated_images") or [])
+                outcome = _item_outcome(result)
+                item.update({
+                    **outcome,
+                    "degraded": degraded,
+                    "products": [
+                        {k: p.get(k) for k in ("product_name", "product_type", "brand_name")}
+                        for p in result.get("products") or []
+                    ],
+                    "outputs": outputs,
+                })
+                metrics.incr("bulk.products_failed" if outcome["status"] == "failed" else "bulk.products_processed")
+            except Exception as e:
+                print(f"❌ Bulk item {item['filename']} failed: {e}")
+                item.update({"status": "failed", "error": str(e)})
+                metrics.incr("bulk.products_failed")
+            item["seconds"] = round(time.perf_counter() - started, 2)
+            # Checkpoint on the event loop so no other item mutates state mid-write
+            job.checkpoint()
+
+    async def _process(self, job: BulkJob, image: Dict) -> Tuple[Dict, Optional[str]]:
+        """Run one product under the API's breaker checks and admission control.
+
+        Returns the agent result and the degradation applied, if any. An open
+        vision circuit fails the item (a resume retries it); an open image-edit
+        circuit degrades it to validation only, like /api/process.
+        """
+        vision_breaker.check()
+        options = dict(job.options)
+        degraded = None
+        if options.get("generate_images", True) and image_edit_breaker.is_open():
+            options["generate_images"] = False
+            degraded = "image_generation_unavailable"
+        cost = generation_concurrency(len(STYLE_REGISTRY)) if options.get("generate_images", True) else 1
+        while True:
+            try:
+                async with self.admission.admit(job.user_id, cost):
+                    return await asyncio.to_thread(self.process_fn, [image], **options), degraded
+            except AdmissionRejected as e:
+                # Background work waits out load shedding instead of failing the product
+                metrics.incr("bulk.admission_retries")
+                await asyncio.sleep(e.retry_after)
+
+    @staticmethod
+    def _save_outputs(job: BulkJob, item: Dict, generated_images: List[Dict]) -> List[Dict]:
+        outputs = []
+        for img in generated_images:
+            if not img.get("image_base64"):
+                continue
+            extension = file_extension(job.options.get("output_format", "jpeg"))
+            name = f"{item['position']:05d}-{img.get('prompt_type', img.get('index'))}.{extension}"
+            with open(os.path.join(job.outputs_dir, name), "wb") as f:
+                f.write(base64.b64decode(img["image_base64"]))
+            outputs.append({
+                "file": name,
+                "url": f"/api/bulk/{job.job_id}/files/{name}",
+                "prompt_type": img.get("prompt_type"),
+                "size": img.get("size"),
+                "mime_type": img.get("mime_type")
+            })
+        return outputs
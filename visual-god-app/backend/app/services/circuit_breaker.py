@@ -0,0 +1,154 @@
+# File: visual-god-app/backend/app/services/circuit_breaker.py
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Tuple
+
+from services import metrics
+
+CIRCUIT_WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+# Calls slower than this count as failures even when they succeed
+VISION_SLOW_CALL_SECONDS = float(os.getenv("VISION_SLOW_CALL_SECONDS", "30"))
+IMAGE_EDIT_SLOW_CALL_SECONDS = float(os.getenv("IMAGE_EDIT_SLOW_CALL_SECONDS", "120"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+    def __init__(self, operation: str, retry_after: int):
+        super().__init__(f"{operation} is temporarily unavailable (circuit open)")
+        self.operation = operation
+        self.retry_after = retry_after
+
+
+def counts_as_failure(error: Exception) -> bool:
+    """Upstream trouble trips the breaker; our own bad requests (4xx except 429) do not"""
+    status = getattr(error, "status_code", None)
+    return status is None or status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    """Rolling-window breaker for one upstream operation.
+
+    Opens when the share of failed or slow calls in the last `window_size`
+    calls reaches `failure_rate`. After `open_seconds` a few probe calls are
+    let through (half-open); their outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, operation: str, slow_call_seconds: float, window_size: int = CIRCUIT_WINDOW_SIZE,
+                 min_calls: int = CIRCUIT_MIN_CALLS, failure_rate: float = CIRCUIT_FAILURE_RATE,
+                 open_seconds: float = CIRCUIT_OPEN_SECONDS, half_open_probes: int = CIRCUIT_HALF_OPEN_PROBES):
+        self.operation = operation
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._outcomes: Deque[bool] = deque(maxlen=window_size)  # True = failed or slow
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_inflight = 0
+        self._lock = threading.Lock()
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._opened_at + self.open_seconds - time.monotonic()))
+
+    def _transition(self, state: str) -> None:
+        print(f"⚡ Circuit {self.operation}: {self._state} -> {state}")
+        metrics.incr(f"circuit.{self.operation}.{state}")
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._outcomes.clear()
+        self._probes_inflight = 0
+
+    def _refresh(self) -> None:
+        if self._state == OPEN and time.monotonic() >= self._opened_at + self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    def is_open(self) -> bool:
+        """True while calls are being rejected (probing calls are still allowed)"""
+        with self._lock:
+            self._refresh()
+            return self._state == OPEN
+
+    def check(self) -> None:
+        """Fail fast before doing local work for a call that would be rejected"""
+        with self._lock:
+            self._refresh()
+            if self._state == OPEN:
+                metrics.incr(f"circuit.{self.operation}.rejected")
+                raise CircuitOpenError(self.operation, self._retry_after())
+
+    def _acquire(self) -> bool:
+        """Admit one call; returns whether it is a half-open probe"""
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                return False
+            if self._state == HALF_OPEN and self._probes_inflight < self.half_open_probes:
+                self._probes_inflight += 1
+                return True
+            metrics.incr(f"circuit.{self.operation}.rejected")
+            retry_after = self._retry_after() if self._state == OPEN else 1
+            raise CircuitOpenError(self.operation, retry_after)
+
+    def _record(self, failed: bool, probe: bool) -> None:
+        with self._lock:
+            if probe:
+                if self._state == HALF_OPEN:
+                    self._transition(OPEN if failed else CLOSED)
+                return
+            if self._state != CLOSED:
+                return
+            self._outcomes.append(failed)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and sum(self._outcomes) / calls >= self.failure_rate:
+                self._transition(OPEN)
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        probe = self._acquire()
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._record(counts_as_failure(e), probe)
+            raise
+        slow = time.monotonic() - started > self.slow_call_seconds
+        if slow:
+            metrics.incr(f"circuit.{self.operation}.slow_calls")
+        self._record(slow, probe)
+        return result
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            self._refresh()
+            calls = len(self._outcomes)
+            return {
+                "state": self._state,
+                "recent_calls": calls,
+                "failure_rate": round(sum(self._outcomes) / calls, 3) if calls else 0.0,
+                "retry_after": self._retry_after() if self._state == OPEN else None
+            }
+
+
+# One breaker per upstream operation, shared by every request in the process
+vision_breaker = CircuitBreaker("vision_validation", VISION_SLOW_CALL_SECONDS)
+image_edit_breaker = CircuitBreaker("image_edit", IMAGE_EDIT_SLOW_CALL_SECONDS)
+BREAKERS = {b.operation: b for b in (vision_breaker, image_edit_breaker)}
+
+
+def breaker_states() -> Dict[str, Dict]:
+    return {name: breaker.snapshot() for name, breaker in BREAKERS.items()}
@@ -4,16 +4,29 @@ import os
 import base64
 import json
 import tempfile
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from openai import OpenAI
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated
 from langchain_openai import ChatOpenAI
 import uuid
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import httpx
 from PIL import Image
 import io
+from services.image_registry import ImageRegistry, open_image_stream, get_image_base64, to_payload
+from services.prescreen import PRESCREEN_ENABLED, prescreen_image
+from services.dedupe import DEDUPE_ENABLED, find_duplicates
+from services.image_encoding import DEFAULT_OUTPUT_FORMAT, DEFAULT_ENCODE_PRESET, encode_image, mime_type
+from services.rendition_store import rendition_store
+from services.styles import STYLE_REGISTRY, resolve_styles
+from services.circuit_breaker import vision_breaker, image_edit_breaker
+from services.tracing import span, traced, traced_node, submit_in_context, traced_http_client, current_trace_parent, current_span
+from services.memory_profiler import profiled
+from services import metrics
 
 # 🎯 SIZE MAPPING for your requirements
 SIZE_MAPPING = {
@@ -22,6 +35,72 @@ SIZE_MAPPING = {
     "youtube": "2560x1440"     # YouTube Banner (16:9)
 }
 
+# Canvases gpt-image-1 can render natively
+NATIVE_GENERATION_SIZES = ["1024x1024", "1024x1536", "1536x1024"]
+
+# "native" picks the canvas closest to each platform's aspect; "square" is the legacy 1024x1024 path
+GENERATION_SIZE_MODE = os.getenv("GENERATION_SIZE_MODE", "native")
+
+# Quality tier per platform ("low", "medium", "high" or "auto" = API default).
+# Unset, the 1024x1024 canvas keeps the API default and the larger native canvases
+# use LARGE_CANVAS_QUALITY, so no platform costs more per image than the legacy square render
+GENERATION_QUALITY = {
+    platform: os.getenv(f"GENERATION_QUALITY_{platform.upper()}")
+    for platform in SIZE_MAPPING
+}
+LARGE_CANVAS_QUALITY = os.getenv("LARGE_CANVAS_QUALITY", "medium")
+
+# Approximate USD per generated image by quality tier and canvas; "auto" is the
+# service's long-standing $0.08 square estimate scaled by canvas area
+GENERATION_COST_USD = {
+    "low": {"1024x1024": 0.011, "1024x1536": 0.016, "1536x1024": 0.016},
+    "medium": {"1024x1024": 0.042, "1024x1536": 0.063, "1536x1024": 0.063},
+    "high": {"1024x1024": 0.167, "1024x1536": 0.25, "1536x1024": 0.25},
+    "auto": {"1024x1024": 0.08, "1024x1536": 0.12, "1536x1024": 0.12},
+}
+
+def _aspect(size: str) -> float:
+    width, height = map(int, size.split('x'))
+    return width / height
+
+def plan_generation_size(image_size: str) -> Dict[str, Any]:
+    """Pick the native generation canvas, quality tier and estimated cost for a platform"""
+    target_size = SIZE_MAPPING.get(image_size, "1080x1920")
+    if GENERATION_SIZE_MODE == "square":
+        generation_size = "1024x1024"
+    else:
+        # Closest aspect ratio in log space, so 9:16 and 16:9 are treated symmetrically
+        target_aspect = math.log(_aspect(target_size))
+        generation_size = min(
+            NATIVE_GENERATION_SIZES,
+            key=lambda size: abs(math.log(_aspect(size)) - target_aspect)
+        )
+    quality = GENERATION_QUALITY.get(image_size) or (
+        "auto" if generation_size == "1024x1024" else LARGE_CANVAS_QUALITY
+    )
+    return {
+        "target_size": target_size,
+        "generation_size": generation_size,
+        "quality": quality,
+        "estimated_cost_usd": GENERATION_COST_USD.get(quality, {}).get(generation_size)
+    }
+
+# Long side of inline previews returned in "preview" response mode
+PREVIEW_MAX_SIDE = int(os.getenv("PREVIEW_MAX_SIDE", "320"))
+# Previews are always JPEG; mime_type describes the full rendition's output_format
+PREVIEW_MIME_TYPE = "image/jpeg"
+
+# "staged" runs each graph stage over every image; "pipelined" starts generating a product as soon as it validates
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "staged")
+PIPELINE_VALIDATION_WORKERS = int(os.getenv("PIPELINE_VALIDATION_WORKERS", "4"))
+PIPELINE_GENERATION_WORKERS = int(os.getenv("PIPELINE_GENERATION_WORKERS", "3"))
+
+def generation_concurrency(generations: int, pipeline_mode: Optional[str] = None) -> int:
+    """Most images.edit calls a run keeps in flight at once (staged generation is sequential)"""
+    if (pipeline_mode or PIPELINE_MODE) == "pipelined":
+        return max(1, min(PIPELINE_GENERATION_WORKERS, generations))
+    return 1
+
 # === ENHANCED STATE FOR PRODUCT-ONLY PROCESSING ===
 class AgentState(TypedDict):
     messages: Annotated[List[Any], lambda l, r: l + r]
@@ -32,56 +111,270 @@ class AgentState(TypedDict):
     session_id: Optional[str]
     generated_images: Optional[List[dict]]
     generate_images_flag: Optional[bool]
-    image_data_list: Optional[List[dict]]
+    image_data_list: Optional[List[dict]]  # Image references from ImageRegistry, not base64
     image_size: Optional[str]
     validation_results: Optional[List[dict]]  # NEW: Store validation results
+    api_calls_saved: Optional[int]  # Vision calls skipped by the local pre-screen
+    dedupe_threshold: Optional[int]  # Hamming threshold; setting it enables near-duplicate folding
+    duplicate_groups: Optional[List[dict]]  # Uploads folded into another product
+    output_format: Optional[str]  # jpeg / progressive_jpeg / webp / avif
+    encode_preset: Optional[str]  # fast / balanced / small / max
+    response_mode: Optional[str]  # "full" inlines every image, "preview" defers full renditions
+    styles: Optional[List[str]]  # Style registry ids to generate (None = all)
+    trace_parent: Optional[Dict[str, str]]  # Request span, for node spans started outside its context
 
 # === UTILS ===
 def get_llm():
     return ChatOpenAI(temperature=0.7, model="gpt-4o")
 
+# One pooled, instrumented httpx client shared by every OpenAI client; it reports
+# bytes and retry attempts on the active trace span and is never closed
+_openai_http_client = traced_http_client(180.0)
+
 def get_openai_client():
     """Create OpenAI client with extended timeout for Railway deployment"""
     return OpenAI(
         api_key=os.environ.get('OPENAI_API_KEY'),
         timeout=180.0,
-        max_retries=1
+        max_retries=1,
+        http_client=_openai_http_client
     )
 
-def resize_image_to_target(image_base64: str, target_size: str) -> str:
-    """Resize image to target dimensions while maintaining quality"""
-    try:
+def _fit_to_target(image: Image.Image, width: int, height: int) -> Image.Image:
+    """Scale to cover width x height, then center-crop"""
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    original_ratio = image.width / image.height
+    target_ratio = width / height
+
+    if original_ratio > target_ratio:
+        new_height = height
+        new_width = int(height * original_ratio)
+        image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        left = (new_width - width) // 2
+        image = image.crop((left, 0, left + width, height))
+    else:
+        new_width = width
+        new_height = int(width / original_ratio)
+        image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        top = (new_height - height) // 2
+        image = image.crop((0, top, width, top + height))
+
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+def render_to_target(image_bytes: bytes, target_size: str,
+                     output_format: str = DEFAULT_OUTPUT_FORMAT,
+                     encode_preset: str = DEFAULT_ENCODE_PRESET) -> bytes:
+    """Resize/crop to target dimensions and encode; returns the encoded bytes"""
+    with span("image.resize_encode", target_size=target_size, output_format=output_format,
+              encode_preset=encode_preset, input_bytes=len(image_bytes)) as encode_span:
         width, height = map(int, target_size.split('x'))
+        image = _fit_to_target(Image.open(io.BytesIO(image_bytes)), width, height)
+        encoded = encode_image(image, output_format, encode_preset)
+        if encode_span is not None:
+            encode_span.set(output_bytes=len(encoded))
+        return encoded
+
+@profiled("resize_image_to_target")
+def resize_image_to_target(image_base64: str, target_size: str,
+                           output_format: str = DEFAULT_OUTPUT_FORMAT,
+                           encode_preset: str = DEFAULT_ENCODE_PRESET) -> str:
+    """Resize image to target dimensions and encode with the chosen format/preset"""
+    try:
         image_data = base64.b64decode(image_base64)
-        image = Image.open(io.BytesIO(image_data))
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        original_ratio = image.width / image.height
-        target_ratio = width / height
-
-        if original_ratio > target_ratio:
-            new_height = height
-            new_width = int(height * original_ratio)
-            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            left = (new_width - width) // 2
-            image = image.crop((left, 0, left + width, height))
-        else:
-            new_width = width
-            new_height = int(width / original_ratio)
-            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            top = (new_height - height) // 2
-            image = image.crop((0, top, width, top + height))
-
-        image = image.resize((width, height), Image.Resampling.LANCZOS)
-        buffer = io.BytesIO()
-        image.save(buffer, format='JPEG', quality=95, optimize=True)
-        return base64.b64encode(buffer.getvalue()).decode('utf-8')
+        return base64.b64encode(render_to_target(image_data, target_size, output_format, encode_preset)).decode('utf-8')
 
     except Exception as e:
         print(f"❌ Error resizing image: {e}")
         return image_base64
 
+@traced("image.preview")
+def make_preview(image_bytes: bytes, target_size: str) -> str:
+    """Small JPEG thumbnail with the target's aspect ratio, base64 encoded"""
+    width, height = map(int, target_size.split('x'))
+    scale = PREVIEW_MAX_SIDE / max(width, height)
+    image = Image.open(io.BytesIO(image_bytes))
+    image.thumbnail((PREVIEW_MAX_SIDE * 2, PREVIEW_MAX_SIDE * 2))
+    image = _fit_to_target(image, max(1, int(width * scale)), max(1, int(height * scale)))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=70)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+# === FOLD NEAR-DUPLICATE UPLOADS ===
+def deduplicate_images(state: AgentState) -> AgentState:
+    """Fold near-identical uploads into one product before validation"""
+    print("🔄 Executing deduplicate_images…")
+    image_data_list = state.get("image_data_list", [])
+    threshold = state.get("dedupe_threshold")
+    # A request-level threshold opts in even when the server default is off
+    if (threshold is None and not DEDUPE_ENABLED) or len(image_data_list) < 2:
+        return {**state, "duplicate_groups": []}
+
+    kept, duplicate_groups = find_duplicates(image_data_list, threshold)
+    if not duplicate_groups:
+        return {**state, "duplicate_groups": []}
+
+    merged_count = len(image_data_list) - len(kept)
+    print(f"   Folded {merged_count} near-duplicate upload(s) into {len(duplicate_groups)} product(s)")
+    metrics.incr("dedupe.images_merged", merged_count)
+    return {
+        **state,
+        "image_data_list": kept,
+        "duplicate_groups": duplicate_groups,
+        "messages": state.get("messages", []) + [
+            AIMessage(content=f"🧬 Merged {merged_count} near-duplicate image{'s' if merged_count > 1 else ''}")
+        ]
+    }
+
 # === NEW: VALIDATE AND CATEGORIZE IMAGES ===
+VALIDATION_PROMPT = """
+Analyze this image and provide a JSON response with the following structure:
+{
+    "is_product": true/false,
+    "category": "product" or "person" or "scene" or "other",
+    "confidence": 0.0-1.0,
+    "description": "Brief description of what you see",
+    "product_name": "Name if it's a product, null otherwise",
+    "product_type": "Category if it's a product, null otherwise",
+    "rejection_reason": "Why rejected if not a product, null otherwise"
+}
+
+Only accept clear photos of physical products (food, cosmetics, electronics, clothing, etc.). 
+Reject people, avatars, scenes, text screenshots, or unclear images.
+                        """
+
+# Schema-constrained output: the structure lives in the schema, so the prompt stays short
+VALIDATION_STRUCTURED_OUTPUT = os.getenv("VALIDATION_STRUCTURED_OUTPUT", "1") == "1"
+VALIDATION_MAX_TOKENS = int(os.getenv("VALIDATION_MAX_TOKENS", "150"))
+
+STRUCTURED_VALIDATION_PROMPT = (
+    "Classify this image. Only accept clear photos of physical products (food, cosmetics, "
+    "electronics, clothing, etc.); reject people, avatars, scenes, text screenshots or unclear images. "
+    "Keep description under 15 words. Use null for product fields when not a product "
+    "and for rejection_reason when accepted."
+)
+
+VALIDATION_SCHEMA = {
+    "name": "image_validation",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "is_product": {"type": "boolean"},
+            "category": {"type": "string", "enum": ["product", "person", "scene", "other"]},
+            "confidence": {"type": "number"},
+            "description": {"type": "string"},
+            "product_name": {"type": ["string", "null"]},
+            "product_type": {"type": ["string", "null"]},
+            "rejection_reason": {"type": ["string", "null"]}
+        },
+        "required": ["is_product", "category", "confidence", "description",
+                     "product_name", "product_type", "rejection_reason"],
+        "additionalProperties": False
+    }
+}
+
+def _record_validation_usage(response) -> None:
+    """Token counters; divide by validation.calls for tokens per validation"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    metrics.incr("validation.prompt_tokens", usage.prompt_tokens or 0)
+    metrics.incr("validation.completion_tokens", usage.completion_tokens or 0)
+    active = current_span()
+    if active is not None:
+        active.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+def _parse_validation(response) -> dict:
+    choice = response.choices[0]
+    if getattr(choice.message, "refusal", None):
+        raise ValueError(f"model refused: {choice.message.refusal}")
+    if choice.finish_reason == "length":
+        metrics.incr("validation.truncated")
+        raise ValueError(f"output cut off at {VALIDATION_MAX_TOKENS} tokens")
+    content = choice.message.content.strip()
+    if VALIDATION_STRUCTURED_OUTPUT:
+        return json.loads(content)
+    start = content.find("{")
+    end = content.rfind("}") + 1
+    return json.loads(content[start:end])
+
+@traced("validate_image")
+def validate_single_image(client: OpenAI, img_data: dict, i: int) -> Tuple[dict, bool]:
+    """Pre-screen and analyze one image; returns (validation result, skipped_api_call).
+
+    Parse failures become an "error" result; OpenAI API errors (and an open
+    circuit) propagate.
+    """
+    # Reject obvious garbage locally before paying for a vision call
+    if PRESCREEN_ENABLED:
+        rejection_reason, scores = prescreen_image(img_data)
+        if rejection_reason:
+            print(f"   ⏭️ Image {i+1} rejected by pre-screen: {rejection_reason}")
+            return {
+                "is_product": False,
+                "category": "other",
+                "confidence": 1.0,
+                "description": "Rejected before analysis",
+                "product_name": None,
+                "product_type": None,
+                "rejection_reason": rejection_reason,
+                "prescreen": scores,
+                "original_image": img_data,
+                "index": img_data.get("index", i)
+            }, True
+
+    if VALIDATION_STRUCTURED_OUTPUT:
+        prompt = STRUCTURED_VALIDATION_PROMPT
+        output_params = {
+            "response_format": {"type": "json_schema", "json_schema": VALIDATION_SCHEMA},
+            "max_tokens": VALIDATION_MAX_TOKENS
+        }
+    else:
+        prompt, output_params = VALIDATION_PROMPT, {}
+
+    with span("openai.vision_validation", model="gpt-4o", image_index=img_data.get("index", i)):
+        response = vision_breaker.call(
+            client.chat.completions.create,
+            model="gpt-4o",
+            temperature=0,
+            messages=[{
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{get_image_base64(img_data)}"}}
+                ]
+            }],
+            **output_params
+        )
+        metrics.incr("validation.calls")
+        _record_validation_usage(response)
+
+    try:
+        validation_data = _parse_validation(response)
+
+        # Keep a reference to the original image (not its bytes)
+        validation_data["original_image"] = img_data
+        validation_data["index"] = img_data.get("index", i)
+
+        print(f"   ✅ Image {i+1} analyzed: {validation_data['category']} - {validation_data['description'][:50]}...")
+        return validation_data, False
+
+    except Exception as e:
+        print(f"   ❌ Failed to parse validation for image {i+1}: {e}")
+        metrics.incr("validation.parse_failures")
+        return {
+            "is_product": False,
+            "category": "error",
+            "confidence": 0.0,
+            "description": "Failed to analyze image",
+            "product_name": None,
+            "product_type": None,
+            "rejection_reason": "Analysis failed",
+            "original_image": img_data,
+            "index": img_data.get("index", i)
+        }, False
+
 def validate_and_categorize_images(state: AgentState) -> AgentState:
     """Validate and categorize uploaded images before processing"""
     print("🔄 Executing validate_and_categorize_images…")
@@ -99,73 +392,24 @@ def validate_and_categorize_images(state: AgentState) -> AgentState:
 
     client = get_openai_client()
     validation_results = []
+    api_calls_saved = 0
 
     try:
         print(f"   Validating and categorizing {len(image_data_list)} images…")
         
         for i, img_data in enumerate(image_data_list):
             print(f"   Processing image {i+1}/{len(image_data_list)}…")
-            
-            # Enhanced validation prompt
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                temperature=0,
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": """
-Analyze this image and provide a JSON response with the following structure:
-{
-    "is_product": true/false,
-    "category": "product" or "person" or "scene" or "other",
-    "confidence": 0.0-1.0,
-    "description": "Brief description of what you see",
-    "product_name": "Name if it's a product, null otherwise",
-    "product_type": "Category if it's a product, null otherwise",
-    "rejection_reason": "Why rejected if not a product, null otherwise"
-}
+            validation_data, skipped_call = validate_single_image(client, img_data, i)
+            validation_results.append(validation_data)
+            api_calls_saved += skipped_call
 
-Only accept clear photos of physical products (food, cosmetics, electronics, clothing, etc.). 
-Reject people, avatars, scenes, text screenshots, or unclear images.
-                        """},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_data['base64']}"}}
-                    ]
-                }]
-            )
-            
-            try:
-                content = response.choices[0].message.content.strip()
-                start = content.find("{")
-                end = content.rfind("}") + 1
-                validation_data = json.loads(content[start:end])
-                
-                # Add original image data
-                validation_data["original_image"] = img_data
-                validation_data["index"] = i
-                
-                validation_results.append(validation_data)
-                
-                print(f"   ✅ Image {i+1} analyzed: {validation_data['category']} - {validation_data['description'][:50]}...")
-                
-            except Exception as e:
-                print(f"   ❌ Failed to parse validation for image {i+1}: {e}")
-                validation_results.append({
-                    "is_product": False,
-                    "category": "error",
-                    "confidence": 0.0,
-                    "description": "Failed to analyze image",
-                    "product_name": None,
-                    "product_type": None,
-                    "rejection_reason": "Analysis failed",
-                    "original_image": img_data,
-                    "index": i
-                })
-
-        print(f"✅ Validation complete: {len(validation_results)} images analyzed")
+        print(f"✅ Validation complete: {len(validation_results)} images analyzed ({api_calls_saved} rejected by pre-screen)")
+        metrics.incr("prescreen.api_calls_saved", api_calls_saved)
         
         return {
             **state,
             "validation_results": validation_results,
+            "api_calls_saved": api_calls_saved,
             "current_step": "images_validated",
             "messages": state.get("messages", []) + [
                 AIMessage(content=f"🔍 Analyzed {len(validation_results)} images")
@@ -184,6 +428,18 @@ Reject people, avatars, scenes, text screenshots, or unclear images.
         }
 
 # === FILTER VALID PRODUCTS ===
+def is_valid_product(result: dict) -> bool:
+    return result.get("is_product", False) and result.get("confidence", 0) > 0.7
+
+def product_from_result(result: dict) -> dict:
+    """Convert a validation result to the format expected by downstream processing"""
+    return {
+        "product_name": result.get("product_name", "Unknown Product"),
+        "product_type": result.get("product_type", "Product"),
+        "brand_name": None,  # Could be enhanced later
+        "original_image": result["original_image"]
+    }
+
 def filter_valid_products(state: AgentState) -> AgentState:
     """Filter and prepare valid products for processing"""
     print("🔄 Executing filter_valid_products…")
@@ -199,10 +455,7 @@ def filter_valid_products(state: AgentState) -> AgentState:
         }
 
     # Filter valid products (confidence > 0.7 and is_product = True)
-    valid_products = [
-        result for result in validation_results 
-        if result.get("is_product", False) and result.get("confidence", 0) > 0.7
-    ]
+    valid_products = [result for result in validation_results if is_valid_product(result)]
     
     if not valid_products:
         print("   ❌ No valid products found")
@@ -219,13 +472,7 @@ def filter_valid_products(state: AgentState) -> AgentState:
     valid_image_data = []
     
     for result in valid_products:
-        product_data = {
-            "product_name": result.get("product_name", "Unknown Product"),
-            "product_type": result.get("product_type", "Product"),
-            "brand_name": None,  # Could be enhanced later
-            "original_image": result["original_image"]
-        }
-        products_scanned.append(product_data)
+        products_scanned.append(product_from_result(result))
         valid_image_data.append(result["original_image"])
 
     print(f"✅ Filtered products: {len(valid_products)} valid products found")
@@ -241,8 +488,25 @@ def filter_valid_products(state: AgentState) -> AgentState:
     }
 
 # === GENERATE SPECIFIC PROMPTS FOR EACH PRODUCT ===
+def prompt_pairs_for_product(product: dict, style_ids: List[str]) -> List[dict]:
+    """One prompt/image pair per selected style"""
+    product_name = product.get("product_name", "the product")
+    original_image = product.get("original_image")
+    print(f"   Generating {len(style_ids)} prompts for: {product_name}")
+    pairs = []
+    for style_id in style_ids:
+        style = STYLE_REGISTRY[style_id]
+        pairs.append({
+            "prompt": style["template"].format(product_name=product_name),
+            "images": [original_image] if original_image else [],
+            "product_name": product_name,
+            "prompt_type": style_id,
+            "prompt_index": list(STYLE_REGISTRY.keys()).index(style_id)
+        })
+    return pairs
+
 def generate_specific_prompts(state: AgentState) -> AgentState:
-    """Generate 3 specific marketing prompts for each product"""
+    """Generate one marketing prompt per selected style for each product"""
     print("🔄 Executing generate_specific_prompts…")
     products = state.get("products_scanned", [])
     if not products:
@@ -256,27 +520,12 @@ def generate_specific_prompts(state: AgentState) -> AgentState:
 
     all_prompts: List[str] = []
     all_prompt_image_pairs: List[dict] = []
-
-    prompt_templates = [
-        "A surreal, bird's-eye view of a city street pedestrian crossing, filled with tiny, realistic people walking in various directions. In the center of the crosswalk lies a giant {product_name}, replacing the crosswalk stripes or interacting with them as if it's part of the scene. The perspective should make the product look enormous in comparison to the people. The style should be ultra-realistic with slight artistic exaggeration, with good lighting and detailed shadows cast by the product and people, similar to a high-end street photography shot.",
-        "A hyper-realistic nighttime city intersection with a massive, curved 3D digital billboard on the side of a modern building. The billboard displays a dynamic 3D advertisement of a floating {product_name}, emerging slightly out of the screen as if it's interacting with the real world. The product is well-lit with cinematic lighting, surrounded by subtle particles and visual effects that emphasize the product's key features. Pedestrians below are watching or walking by, giving a sense of scale and realism. The overall atmosphere is futuristic, premium, and similar to Times Square or Piccadilly Circus LED displays.",
-        "Create a clean, high-end editorial product layout featuring {product_name}, inspired by premium sneaker and fashion catalog designs. The composition should include: A large, detailed top-down product view on the right side of the image. A cluster of 3 to 4 angled or stacked product views in the bottom-left area. A minimalist light background (off-white or neutral gray), with soft shadows and clean studio lighting. No text or logos anywhere in the image. The layout should feel like a modern fashion magazine or product showcase, balanced and highly aesthetic, with careful placement and visual harmony. Use photorealistic lighting, professional product rendering style, and subtle depth and shadows."
-    ]
+    style_ids = state.get("styles") or list(STYLE_REGISTRY.keys())
 
     for product in products:
-        product_name = product.get("product_name", "the product")
-        original_image = product.get("original_image")
-        print(f"   Generating 3 prompts for: {product_name}")
-        for idx, template in enumerate(prompt_templates):
-            prompt = template.format(product_name=product_name)
-            all_prompts.append(prompt)
-            all_prompt_image_pairs.append({
-                "prompt": prompt,
-                "images": [original_image] if original_image else [],
-                "product_name": product_name,
-                "prompt_type": f"style_{idx+1}",
-                "prompt_index": idx
-            })
+        pairs = prompt_pairs_for_product(product, style_ids)
+        all_prompts.extend(pair["prompt"] for pair in pairs)
+        all_prompt_image_pairs.extend(pairs)
 
     print(f"✅ Generated {len(all_prompt_image_pairs)} prompts for {len(products)} product(s)")
     return {
@@ -285,11 +534,142 @@ def generate_specific_prompts(state: AgentState) -> AgentState:
         "prompt_image_pairs": all_prompt_image_pairs,
         "current_step": "prompts_generated",
         "messages": state.get("messages", []) + [
-            AIMessage(content=f"🎬 Generated 3 creative prompts for each product ({len(all_prompt_image_pairs)} total prompts)")
+            AIMessage(content=f"🎬 Generated {len(style_ids)} creative prompt{'s' if len(style_ids) > 1 else ''} for each product ({len(all_prompt_image_pairs)} total prompts)")
         ]
     }
 
 # === GENERATE IMAGES WITH GPT-IMAGE-1 ===
+def generation_settings(state: AgentState) -> Dict[str, Any]:
+    """Size plan and encoding options shared by every image of a request"""
+    plan = plan_generation_size(state.get("image_size", "instagram"))
+    return {
+        "plan": plan,
+        "target_size": plan["target_size"],
+        "generation_size": plan["generation_size"],
+        "output_format": state.get("output_format") or DEFAULT_OUTPUT_FORMAT,
+        "encode_preset": state.get("encode_preset") or DEFAULT_ENCODE_PRESET,
+        "preview_mode": state.get("response_mode") == "preview"
+    }
+
+@traced("generate_image")
+def generate_single_image(client: OpenAI, pair: dict, idx: int, total: int, settings: Dict[str, Any]) -> dict:
+    """Run one images.edit call for a prompt/image pair and resize/encode the result"""
+    prompt = pair["prompt"]
+    input_image_data = pair["images"][0]
+    product_name = pair.get("product_name", f"Product {idx}")
+    prompt_type = pair.get("prompt_type", f"style_{idx}")
+    plan = settings["plan"]
+    target_size = settings["target_size"]
+    generation_size = settings["generation_size"]
+    output_format = settings["output_format"]
+    encode_preset = settings["encode_preset"]
+    preview_mode = settings["preview_mode"]
+
+    # Skip the local compression work when the edit call would be rejected anyway
+    image_edit_breaker.check()
+
+    print(f"🔁 Generating image {idx+1}/{total} for {product_name} ({prompt_type})")
+
+    with span("image.compress_input", product_name=product_name, prompt_type=prompt_type) as compress_span:
+        # Compress image before sending to reduce 413 errors
+        image = Image.open(open_image_stream(input_image_data))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Resize if too large (max 4MB for OpenAI)
+        max_size = 1024  # Reduce max dimension
+        if max(image.width, image.height) > max_size:
+            ratio = max_size / max(image.width, image.height)
+            new_width = int(image.width * ratio)
+            new_height = int(image.height * ratio)
+            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+        # Save compressed image
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=85, optimize=True)  # Reduced quality
+        compressed_bytes = buffer.getvalue()
+        if compress_span is not None:
+            compress_span.set(output_bytes=len(compressed_bytes))
+
+    print(f"   Original size: {input_image_data.get('size', 'unknown')} bytes, Compressed: {len(compressed_bytes)} bytes")
+
+    with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
+        temp_file.write(compressed_bytes)
+        temp_file_path = temp_file.name
+
+    try:
+        enhanced_prompt = f"{prompt} High quality, professional photography, ultra-detailed, cinematic."
+        # Styles may pin their own canvas/quality; otherwise the platform plan applies
+        style = STYLE_REGISTRY.get(prompt_type, {})
+        pair_generation_size = style.get("generation_size") or generation_size
+        pair_quality = style.get("quality") or plan["quality"]
+        edit_params = {"size": pair_generation_size}
+        if pair_quality != "auto":
+            edit_params["quality"] = pair_quality
+        generation_started = time.perf_counter()
+        with span("openai.image_edit", model="gpt-image-1", input_bytes=len(compressed_bytes), **edit_params), \
+                open(temp_file_path, 'rb') as image_file:
+            result = image_edit_breaker.call(
+                client.images.edit,
+                model="gpt-image-1",
+                image=image_file,
+                prompt=enhanced_prompt,
+                n=1,
+                **edit_params
+            )
+        generation_seconds = time.perf_counter() - generation_started
+
+        generated_base64 = result.data[0].b64_json
+        encode_started = time.perf_counter()
+        image_id = None
+        preview_base64 = None
+        resized_base64 = None
+        output_mime_type = mime_type(output_format)
+        if preview_mode:
+            # Ship a thumbnail now; the full rendition is encoded on first GET /api/images/{id}
+            generated_bytes = base64.b64decode(generated_base64)
+            preview_base64 = make_preview(generated_bytes, target_size)
+            image_id = rendition_store.put(
+                generated_bytes,
+                lambda source, t=target_size, f=output_format, p=encode_preset: render_to_target(source, t, f, p),
+                output_mime_type
+            )
+        else:
+            print(f"🔧 Resizing from {pair_generation_size} to {target_size}")
+            resized_base64 = resize_image_to_target(generated_base64, target_size, output_format, encode_preset)
+            if resized_base64 is generated_base64:
+                # Resize/encode failed and the gpt-image-1 PNG came back unchanged
+                output_mime_type = "image/png"
+        encode_seconds = time.perf_counter() - encode_started
+        print(f"   ⏱️ generation {generation_seconds:.1f}s, resize+encode {encode_seconds * 1000:.0f}ms")
+
+        print(f"✅ Generated and resized image {idx+1} for {product_name} ({prompt_type})")
+        return {
+            "prompt": prompt,
+            "image_base64": resized_base64,
+            "preview_base64": preview_base64,
+            "image_id": image_id,
+            "image_url": f"/api/images/{image_id}" if image_id else None,
+            "index": idx,
+            "input_image": input_image_data.get('filename', f"image_{idx}"),
+            "size": target_size,
+            "generation_size": pair_generation_size,
+            "mime_type": output_mime_type,
+            "preview_mime_type": PREVIEW_MIME_TYPE if preview_base64 else None,
+            "product_name": product_name,
+            "prompt_type": prompt_type,
+            "timings_ms": {
+                "generation": round(generation_seconds * 1000),
+                "resize_encode": round(encode_seconds * 1000)
+            }
+        }
+
+    finally:
+        try:
+            os.unlink(temp_file_path)
+        except:
+            pass
+
 def generate_images_with_gpt_image_1(state: AgentState) -> AgentState:
     """Generate images using GPT-Image-1 with smaller file sizes"""
     print("🎨 Executing GPT-Image-1 generation for all products...")
@@ -304,11 +684,12 @@ def generate_images_with_gpt_image_1(state: AgentState) -> AgentState:
             ]
         }
 
-    prompt_image_pairs = state.get("prompt_image_pairs", [])
-    image_size = state.get("image_size", "instagram")
-    target_size = SIZE_MAPPING.get(image_size, "1080x1920")
+    prompt_image_pairs = state.get("prompt_image_pairs") or []
+    settings = generation_settings(state)
+    plan = settings["plan"]
+    target_size = settings["target_size"]
 
-    print(f"📦 Found {len(prompt_image_pairs)} prompt-image pairs, target size: {target_size}")
+    print(f"📦 Found {len(prompt_image_pairs)} prompt-image pairs, target size: {target_size} (generating at {settings['generation_size']}, quality={plan['quality']})")
     if not prompt_image_pairs:
         print("⚠️ No prompt_image_pairs found in state!")
         return {
@@ -324,91 +705,145 @@ def generate_images_with_gpt_image_1(state: AgentState) -> AgentState:
     errors: List[str] = []
 
     for idx, pair in enumerate(prompt_image_pairs):
-        prompt = pair["prompt"]
-        image_data_list = pair["images"]
         product_name = pair.get("product_name", f"Product {idx}")
-        prompt_type = pair.get("prompt_type", f"style_{idx}")
 
-        if not image_data_list:
+        if not pair["images"]:
             print(f"   No images available for prompt {idx+1}")
             continue
 
         try:
-            print(f"🔁 Generating image {idx+1}/{len(prompt_image_pairs)} for {product_name} ({prompt_type})")
-            input_image_data = image_data_list[0]
-            image_bytes = base64.b64decode(input_image_data['base64'])
-
-            # Compress image before sending to reduce 413 errors
-            image = Image.open(io.BytesIO(image_bytes))
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Resize if too large (max 4MB for OpenAI)
-            max_size = 1024  # Reduce max dimension
-            if max(image.width, image.height) > max_size:
-                ratio = max_size / max(image.width, image.height)
-                new_width = int(image.width * ratio)
-                new_height = int(image.height * ratio)
-                image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-            # Save compressed image
-            buffer = io.BytesIO()
-            image.save(buffer, format='JPEG', quality=85, optimize=True)  # Reduced quality
-            compressed_bytes = buffer.getvalue()
-            
-            print(f"   Original size: {len(image_bytes)} bytes, Compressed: {len(compressed_bytes)} bytes")
+            generated_images.append(generate_single_image(client, pair, idx, len(prompt_image_pairs), settings))
+        except Exception as e:
+            error_msg = f"❌ Failed to generate image {idx+1} for {product_name}: {e}"
+            print(error_msg)
+            errors.append(error_msg)
 
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-                temp_file.write(compressed_bytes)
-                temp_file_path = temp_file.name
+    status_message = (
+        f"✅ Generated {len(generated_images)} {target_size} images using GPT-Image-1."
+        if generated_images else "❌ No images generated."
+    )
+    return {
+        **state,
+        "generated_images": generated_images,
+        "current_step": "image_batch_generated",
+        "messages": state.get("messages", []) + [
+            AIMessage(content=status_message)
+        ] + [AIMessage(content=msg) for msg in errors]
+    }
 
+# === PIPELINED VALIDATION + GENERATION ===
+def validate_and_generate_pipelined(state: AgentState) -> AgentState:
+    """Validate images concurrently; each product starts generating as soon as it passes"""
+    print("🔄 Executing validate_and_generate_pipelined…")
+    image_data_list = state.get("image_data_list", [])
+    if not image_data_list:
+        return {
+            **state,
+            "current_step": "no_images",
+            "validation_results": [],
+            "messages": state.get("messages", []) + [
+                AIMessage(content="❌ No images provided")
+            ]
+        }
+
+    client = get_openai_client()
+    settings = generation_settings(state)
+    style_ids = state.get("styles") or list(STYLE_REGISTRY.keys())
+    generate_flag = state.get("generate_images_flag", True)
+
+    validation_results: List[dict] = []
+    products: List[dict] = []
+    pairs: List[Tuple[Tuple[int, int], dict]] = []  # ((upload index, style order), pair)
+    generation_futures = {}
+    errors: List[str] = []
+    api_calls_saved = 0
+
+    with ThreadPoolExecutor(PIPELINE_VALIDATION_WORKERS) as validation_pool, \
+            ThreadPoolExecutor(PIPELINE_GENERATION_WORKERS) as generation_pool:
+        validation_futures = {
+            submit_in_context(validation_pool, validate_single_image, client, img_data, i): (i, img_data)
+            for i, img_data in enumerate(image_data_list)
+        }
+        for future in as_completed(validation_futures):
+            i, img_data = validation_futures[future]
             try:
-                enhanced_prompt = f"{prompt} High quality, professional photography, ultra-detailed, cinematic."
-                with open(temp_file_path, 'rb') as image_file:
-                    result = client.images.edit(
-                        model="gpt-image-1",
-                        image=image_file,
-                        prompt=enhanced_prompt,
-                        size="1024x1024",
-                        n=1
+                result, skipped_call = future.result()
+            except Exception as e:
+                print(f"   OpenAI API error for image {i+1}: {e}")
+                errors.append(f"❌ Validation failed for image {i+1}: {e}")
+                result, skipped_call = {
+                    "is_product": False,
+                    "category": "error",
+                    "confidence": 0.0,
+                    "description": "Failed to analyze image",
+                    "product_name": None,
+                    "product_type": None,
+                    "rejection_reason": "Analysis failed",
+                    "original_image": img_data,
+                    "index": img_data.get("index", i)
+                }, False
+            validation_results.append(result)
+            api_calls_saved += skipped_call
+            if not is_valid_product(result):
+                continue
+
+            product = product_from_result(result)
+            products.append(product)
+            for pair in prompt_pairs_for_product(product, style_ids):
+                key = (result["index"], pair["prompt_index"])
+                pairs.append((key, pair))
+                if generate_flag and pair["images"]:
+                    # Final indexes are only known once every image is validated
+                    generation_futures[key] = submit_in_context(
+                        generation_pool, generate_single_image, client, pair, len(pairs) - 1, len(image_data_list) * len(style_ids), settings
                     )
 
-                generated_base64 = result.data[0].b64_json
-                print(f"🔧 Resizing from 1024x1024 to {target_size}")
-                resized_base64 = resize_image_to_target(generated_base64, target_size)
-
-                generated_images.append({
-                    "prompt": prompt,
-                    "image_base64": resized_base64,
-                    "image_url": None,
-                    "index": idx,
-                    "input_image": input_image_data.get('filename', f"image_{idx}"),
-                    "size": target_size,
-                    "product_name": product_name,
-                    "prompt_type": prompt_type
-                })
-                print(f"✅ Generated and resized image {idx+1} for {product_name} ({prompt_type})")
+        pairs.sort(key=lambda item: item[0])
+        generated_images: List[dict] = []
+        for idx, (key, pair) in enumerate(pairs):
+            future = generation_futures.get(key)
+            if future is None:
+                continue
+            try:
+                generated_images.append({**future.result(), "index": idx})
+            except Exception as e:
+                error_msg = f"❌ Failed to generate image {idx+1} for {pair['product_name']}: {e}"
+                print(error_msg)
+                errors.append(error_msg)
 
-            finally:
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
+    metrics.incr("prescreen.api_calls_saved", api_calls_saved)
+    validation_results.sort(key=lambda r: r.get("index", 0))
+    products.sort(key=lambda p: p["original_image"].get("index", 0))
+    print(f"✅ Pipelined run: {len(products)} product(s), {len(generated_images)} image(s) generated")
 
-        except Exception as e:
-            error_msg = f"❌ Failed to generate image {idx+1} for {product_name}: {e}"
-            print(error_msg)
-            errors.append(error_msg)
+    if not products:
+        return {
+            **state,
+            "validation_results": validation_results,
+            "api_calls_saved": api_calls_saved,
+            "current_step": "no_valid_products",
+            "messages": state.get("messages", []) + [
+                AIMessage(content="❌ No valid product images found. Please upload clear photos of physical products only.")
+            ] + [AIMessage(content=msg) for msg in errors]
+        }
 
     status_message = (
-        f"✅ Generated {len(generated_images)} {target_size} images using GPT-Image-1."
-        if generated_images else "❌ No images generated."
+        f"✅ Generated {len(generated_images)} {settings['target_size']} images using GPT-Image-1."
+        if generated_images else
+        ("⏭️ Image generation skipped (disabled by user)" if not generate_flag else "❌ No images generated.")
     )
     return {
         **state,
+        "validation_results": validation_results,
+        "api_calls_saved": api_calls_saved,
+        "products_scanned": products,
+        "image_data_list": [p["original_image"] for p in products],
+        "edit_prompts": [pair["prompt"] for _, pair in pairs],
+        "prompt_image_pairs": [pair for _, pair in pairs],
         "generated_images": generated_images,
         "current_step": "image_batch_generated",
         "messages": state.get("messages", []) + [
+            AIMessage(content=f"✅ Found {len(products)} valid product image{'s' if len(products) > 1 else ''}"),
             AIMessage(content=status_message)
         ] + [AIMessage(content=msg) for msg in errors]
     }
@@ -452,20 +887,26 @@ def decide_next_step(state: AgentState) -> str:
         return "end_processing"
 
 # === GRAPH BUILDER ===
+def instrument_node(fn):
+    """Graph node wrapped in a trace span and, when requested, a memory-profile stage"""
+    return traced_node(profiled(f"node.{fn.__name__}")(fn))
+
 def build_product_only_agent():
     print("🏗️ Building enhanced product-only agent with validation…")
     graph = StateGraph(AgentState)
     
     # Add nodes
-    graph.add_node("validate_and_categorize_images", validate_and_categorize_images)
-    graph.add_node("filter_valid_products", filter_valid_products)
-    graph.add_node("generate_specific_prompts", generate_specific_prompts)
-    graph.add_node("generate_images_with_gpt_image_1", generate_images_with_gpt_image_1)
-    graph.add_node("invalid_upload", invalid_upload)
-    graph.add_node("end_processing", end_processing)
+    graph.add_node("deduplicate_images", instrument_node(deduplicate_images))
+    graph.add_node("validate_and_categorize_images", instrument_node(validate_and_categorize_images))
+    graph.add_node("filter_valid_products", instrument_node(filter_valid_products))
+    graph.add_node("generate_specific_prompts", instrument_node(generate_specific_prompts))
+    graph.add_node("generate_images_with_gpt_image_1", instrument_node(generate_images_with_gpt_image_1))
+    graph.add_node("invalid_upload", instrument_node(invalid_upload))
+    graph.add_node("end_processing", instrument_node(end_processing))
 
     # Set entry point
-    graph.set_entry_point("validate_and_categorize_images")
+    graph.set_entry_point("deduplicate_images")
+    graph.add_edge("deduplicate_images", "validate_and_categorize_images")
     
     # Add conditional edges
     graph.add_conditional_edges(
@@ -488,21 +929,94 @@ def build_product_only_agent():
     print("✅ Enhanced product-only agent built successfully")
     return graph.compile()
 
+def build_pipelined_agent():
+    """Same pipeline without stage barriers: validation and generation overlap"""
+    print("🏗️ Building pipelined product-only agent…")
+    graph = StateGraph(AgentState)
+
+    graph.add_node("deduplicate_images", instrument_node(deduplicate_images))
+    graph.add_node("validate_and_generate_pipelined", instrument_node(validate_and_generate_pipelined))
+    graph.add_node("invalid_upload", instrument_node(invalid_upload))
+    graph.add_node("end_processing", instrument_node(end_processing))
+
+    graph.set_entry_point("deduplicate_images")
+    graph.add_edge("deduplicate_images", "validate_and_generate_pipelined")
+    graph.add_conditional_edges(
+        "validate_and_generate_pipelined",
+        decide_next_step,
+        {
+            "invalid_upload": "invalid_upload",
+            "end_processing": "end_processing"
+        }
+    )
+    graph.add_edge("invalid_upload", "end_processing")
+    graph.add_edge("end_processing", END)
+
+    print("✅ Pipelined product-only agent built successfully")
+    return graph.compile()
+
+def _with_image_payloads(items: List[dict]) -> List[dict]:
+    """Expand original_image references into base64 payloads for API responses"""
+    payloads: Dict[str, dict] = {}
+    expanded = []
+    for item in items:
+        ref = item.get("original_image")
+        if ref and "handle" in ref:
+            # One payload per image even when it appears in several result lists
+            if ref["handle"] not in payloads:
+                payloads[ref["handle"]] = to_payload(ref)
+            item = {**item, "original_image": payloads[ref["handle"]]}
+        expanded.append(item)
+    return expanded
+
+def _select_fields(items: List[dict], fields: Optional[List[str]]) -> List[dict]:
+    """Keep only the requested keys of each result (index is always kept)"""
+    if not fields:
+        return items
+    wanted = set(fields) | {"index"}
+    return [{k: v for k, v in item.items() if k in wanted} for item in items]
+
+def _compact_results(items: List[dict], fields: Optional[List[str]]) -> List[dict]:
+    """Validation results that refer to images by index and digest instead of echoing them"""
+    compact = []
+    for item in items:
+        ref = item.get("original_image") or {}
+        entry = {k: v for k, v in item.items() if k != "original_image"}
+        entry["filename"] = ref.get("filename")
+        entry["digest"] = ref.get("digest")
+        compact.append(entry)
+    return _select_fields(compact, fields)
+
+def _with_image_summaries(items: List[dict]) -> List[dict]:
+    """Replace original_image references with a bytes-free summary (handles die with the request)"""
+    return [
+        {**item, "original_image": {k: item["original_image"].get(k) for k in ("filename", "index", "digest")}}
+        if item.get("original_image") else item
+        for item in items
+    ]
+
 # === MAIN AGENT CLASS ===
 class ContentAgent:
     def __init__(self):
         self.agent = build_product_only_agent()
+        self.pipelined_agent = build_pipelined_agent()
         if not os.environ.get('OPENAI_API_KEY'):
             raise ValueError("OPENAI_API_KEY environment variable is required")
 
-    def validate_images(self, image_data_list: List[Dict]) -> Dict:
-        """Validate and categorize images without generating"""
+    def validate_images(self, image_data_list: List[Dict], compact: bool = False, fields: Optional[List[str]] = None) -> Dict:
+        """Validate and categorize images without generating.
+
+        compact=True drops the echoed base64: results carry the upload index and
+        image digest, and valid_products / rejected_images become index lists.
+        fields limits each result to the named keys (index is always kept).
+        """
+        registry = ImageRegistry()
         try:
             print(f"🔄 Validating {len(image_data_list)} images…")
 
             initial_state = {
                 "messages": [HumanMessage(content="Validating images...")],
-                "image_data_list": image_data_list,
+                "image_data_list": registry.register_all(image_data_list),
                 "generate_images_flag": False,  # Don't generate, just validate
                 "current_step": "initialized"
             }
@@ -515,13 +1029,25 @@ class ContentAgent:
             # Categorize results
             products = [r for r in validation_results if r.get("is_product", False) and r.get("confidence", 0) > 0.7]
             non_products = [r for r in validation_results if not (r.get("is_product", False) and r.get("confidence", 0) > 0.7)]
+
+            if compact:
+                validation_results = _compact_results(validation_results, fields)
+                products = [r["index"] for r in products]
+                non_products = [r["index"] for r in non_products]
+            else:
+                validation_results = _select_fields(_with_image_payloads(validation_results), fields)
+                by_index = {r["index"]: r for r in validation_results}
+                products = [by_index[r["index"]] for r in products]
+                non_products = [by_index[r["index"]] for r in non_products]
             
             return {
                 "success": True,
+                "compact": compact,
                 "validation_results": validation_results,
                 "valid_products": products,
                 "rejected_images": non_products,
                 "can_proceed": len(products) > 0,
+                "api_calls_saved": validation_state.get("api_calls_saved", 0),
                 "message": f"Found {len(products)} valid product(s) and {len(non_products)} non-product image(s)"
             }
 
@@ -535,22 +1061,36 @@ class ContentAgent:
                 "rejected_images": [],
                 "can_proceed": False
             }
+        finally:
+            registry.close()
 
-    def process(self, image_data_list: List[Dict], generate_images: bool = True, image_size: str = "instagram") -> Dict:
+    def process(self, image_data_list: List[Dict], generate_images: bool = True, image_size: str = "instagram",
+                dedupe_threshold: Optional[int] = None, output_format: str = DEFAULT_OUTPUT_FORMAT,
+                encode_preset: str = DEFAULT_ENCODE_PRESET, response_mode: str = "full",
+                styles: Optional[List[str]] = None, pipeline_mode: Optional[str] = None) -> Dict:
         """Main processing pipeline with enhanced validation"""
+        registry = ImageRegistry()
         try:
             target_size = SIZE_MAPPING.get(image_size, "1080x1920")
+            style_ids = resolve_styles(styles)
             print(f"🔄 Processing {len(image_data_list)} images (products only, target: {target_size})…")
 
             initial_state = {
                 "messages": [HumanMessage(content="Processing product images...")],
-                "image_data_list": image_data_list,
+                "image_data_list": registry.register_all(image_data_list),
                 "generate_images_flag": generate_images,
                 "image_size": image_size,
+                "dedupe_threshold": dedupe_threshold,
+                "output_format": output_format,
+                "encode_preset": encode_preset,
+                "response_mode": response_mode,
+                "styles": style_ids,
+                "trace_parent": current_trace_parent(),
                 "current_step": "initialized"
             }
 
-            final_state = self.agent.invoke(initial_state)
+            graph = self.pipelined_agent if (pipeline_mode or PIPELINE_MODE) == "pipelined" else self.agent
+            final_state = graph.invoke(initial_state)
 
             # Handle cancellation gracefully
             if final_state.get("current_step") == "cancelled":
@@ -564,26 +1104,29 @@ class ContentAgent:
                     "generated_images": []
                 }
 
+            # Graph nodes may leave list fields as None (e.g. generation skipped), so coerce to []
             result = {
                 "success": final_state.get("current_step") == "processing_complete",
-                "validation_results": final_state.get("validation_results", []),
-                "descriptions": ["product"] * len(final_state.get("products_scanned", [])),
-                "products": final_state.get("products_scanned", []),
-                "prompts": final_state.get("edit_prompts", []),
+                "validation_results": _with_image_summaries(final_state.get("validation_results") or []),
+                "descriptions": ["product"] * len(final_state.get("products_scanned") or []),
+                "products": _with_image_summaries(final_state.get("products_scanned") or []),
+                "prompts": final_state.get("edit_prompts") or [],
                 "has_avatar": False,
                 "avatar_type": None,
-                "generated_images": final_state.get("generated_images", []),
+                "generated_images": final_state.get("generated_images") or [],
                 "session_id": final_state.get("session_id"),
                 "current_step": final_state.get("current_step"),
                 "image_format": target_size,
-                "messages": [msg.content for msg in final_state.get("messages", []) if hasattr(msg, 'content')]
+                "api_calls_saved": final_state.get("api_calls_saved", 0),
+                "duplicates_merged": final_state.get("duplicate_groups") or [],
+                "messages": [msg.content for msg in (final_state.get("messages") or []) if hasattr(msg, 'content')]
             }
 
             num_products = len(result.get("products", []))
             num_images = len(result.get("generated_images", []))
             result["message"] = (
                 f"Successfully processed {num_products} product(s)"
-                + (f" and generated {num_images} enhanced {target_size} images (3 styles per product)" if num_images > 0 else "")
+                + (f" and generated {num_images} enhanced {target_size} images ({len(style_ids)} style{'s' if len(style_ids) > 1 else ''} per product)" if num_images > 0 else "")
             )
 
             if not result["success"]:
@@ -604,18 +1147,24 @@ class ContentAgent:
                 "generated_images": [],
                 "messages": [f"Error: {str(e)}"]
             }
+        finally:
+            registry.close()
 
-    def generate_images(self, prompts: List[str], images_data: List[Dict], max_images: int = 3, image_size: str = "instagram") -> List[Dict]:
+    def generate_images(self, prompts: List[str], images_data: List[Dict], max_images: int = 3, image_size: str = "instagram",
+                        output_format: str = DEFAULT_OUTPUT_FORMAT, encode_preset: str = DEFAULT_ENCODE_PRESET,
+                        response_mode: str = "full") -> List[Dict]:
         """Generate images using provided prompts and images"""
+        registry = ImageRegistry()
         try:
             target_size = SIZE_MAPPING.get(image_size, "1080x1920")
             print(f"🎨 Generating {target_size} images…")
 
+            image_refs = registry.register_all(images_data)
             prompt_image_pairs: List[dict] = []
             for i, prompt in enumerate(prompts[:max_images]):
                 prompt_image_pairs.append({
                     "prompt": prompt,
-                    "images": images_data,
+                    "images": image_refs,
                     "product_name": f"Product {i//3 + 1}",
                     "prompt_type": f"style_{(i%3) + 1}"
                 })
@@ -624,6 +1173,9 @@ class ContentAgent:
                 "prompt_image_pairs": prompt_image_pairs,
                 "generate_images_flag": True,
                 "image_size": image_size,
+                "output_format": output_format,
+                "encode_preset": encode_preset,
+                "response_mode": response_mode,
                 "messages": []
             }
 
@@ -633,6 +1185,8 @@ class ContentAgent:
         except Exception as e:
             print(f"❌ Image generation failed: {str(e)}")
             return []
+        finally:
+            registry.close()
 
 # Singleton instance
 agent = ContentAgent()
\ No newline at end of file
@@ -0,0 +1,114 @@
+# File: visual-god-app/backend/app/services/dedupe.py
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from services.image_registry import open_image_stream
+
+# Off by default: requests opt in by passing dedupe_threshold
+DEDUPE_ENABLED = os.getenv("DEDUPE_ENABLED", "0") == "1"
+DEDUPE_HASH = os.getenv("DEDUPE_HASH", "dhash")  # "dhash" or "ahash"
+DEDUPE_HAMMING_THRESHOLD = int(os.getenv("DEDUPE_HAMMING_THRESHOLD", "8"))
+
+HASH_SIZE = 8
+
+
+def _grayscale(image_ref: Dict, size: Tuple[int, int]) -> List[int]:
+    image = Image.open(open_image_stream(image_ref))
+    image.draft("L", (size[0] * 16, size[1] * 16))
+    image = image.convert("L").resize(size, Image.Resampling.BILINEAR)
+    return list(image.getdata())
+
+
+def average_hash(image_ref: Dict) -> int:
+    """64-bit aHash: each pixel compared with the mean brightness"""
+    pixels = _grayscale(image_ref, (HASH_SIZE, HASH_SIZE))
+    mean = sum(pixels) / len(pixels)
+    value = 0
+    for pixel in pixels:
+        value = (value << 1) | (pixel > mean)
+    return value
+
+
+def difference_hash(image_ref: Dict) -> int:
+    """64-bit dHash: horizontal brightness gradient signs"""
+    width = HASH_SIZE + 1
+    pixels = _grayscale(image_ref, (width, HASH_SIZE))
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[row * width + col] > pixels[row * width + col + 1])
+    return value
+
+
+HASHERS = {"ahash": average_hash, "dhash": difference_hash}
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def find_duplicates(image_refs: List[Dict], threshold: Optional[int] = None) -> Tuple[List[Dict], List[Dict]]:
+    """Fold near-identical images together.
+
+    Returns (kept_refs, groups) where each group reports the kept image and
+    the uploads merged into it. The highest-resolution upload of a group is
+    kept; ties go to the earliest one.
+    """
+    threshold = DEDUPE_HAMMING_THRESHOLD if threshold is None else threshold
+    hasher = HASHERS.get(DEDUPE_HASH, difference_hash)
+
+    groups: List[Dict] = []
+    for ref in image_refs:
+        try:
+            phash = hasher(ref)
+        except Exception:
+            # Unreadable files are left for the pre-screen to reject
+            groups.append({"kept": ref, "hash": None, "merged": []})
+            continue
+
+        match = None
+        for group in groups:
+            if group["hash"] is None:
+                continue
+            distance = 0 if group["kept"].get("digest") == ref.get("digest") else hamming(group["hash"], phash)
+            if distance <= threshold:
+                match = (group, distance)
+                break
+
+        if match is None:
+            groups.append({"kept": ref, "hash": phash, "merged": []})
+            continue
+
+        group, distance = match
+        group["merged"].append({"ref": ref, "distance": distance})
+        if _pixels(ref) > _pixels(group["kept"]):
+            # Swap so the sharper upload is the one that gets generated
+            previous = group["kept"]
+            group["kept"] = ref
+            group["hash"] = phash  # Later uploads are compared against the kept image
+            group["merged"][-1]["ref"] = previous
+
+    kept = sorted((g["kept"] for g in groups), key=lambda r: r.get("index", 0))
+    report = [
+        {
+            "kept_index": g["kept"].get("index"),
+            "kept_filename": g["kept"].get("filename"),
+            "merged": [
+                {"index": m["ref"].get("index"), "filename": m["ref"].get("filename"), "distance": m["distance"]}
+                for m in g["merged"]
+            ]
+        }
+        for g in groups if g["merged"]
+    ]
+    return kept, report
+
+
+def _pixels(image_ref: Dict) -> int:
+    try:
+        width, height = Image.open(open_image_stream(image_ref)).size
+        return width * height
+    except Exception:
+        return 0
@@ -0,0 +1,84 @@
+# File: visual-god-app/backend/app/services/idempotency.py
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from services import metrics
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "900"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "64"))
+IDEMPOTENCY_MAX_BYTES = int(os.getenv("IDEMPOTENCY_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class IdempotencyConflict(Exception):
+    """Raised when a key is reused with a different request payload"""
+
+
+def _approx_size(response: Dict) -> int:
+    """Rough byte size of a stored response, dominated by image payloads"""
+    size = 1024
+    for img in response.get("generated_images") or []:
+        size += len(img.get("image_base64") or "") + len(img.get("preview_base64") or "")
+    return size
+
+
+class IdempotencyStore:
+    """Bounded, TTL-limited store of completed responses keyed by Idempotency-Key"""
+
+    def __init__(self, ttl_seconds: float = IDEMPOTENCY_TTL_SECONDS,
+                 max_entries: int = IDEMPOTENCY_MAX_ENTRIES,
+                 max_bytes: int = IDEMPOTENCY_MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now: float) -> None:
+        for key in [k for k, e in self._entries.items() if e["expires_at"] <= now]:
+            self._bytes -= self._entries.pop(key)["size"]
+
+    def lookup(self, key: str, fingerprint: str) -> Optional[Dict]:
+        """Return a copy of the stored response, or None if the key is unknown"""
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["fingerprint"] != fingerprint:
+                raise IdempotencyConflict("Idempotency-Key was already used with a different request body")
+            self._entries.move_to_end(key)
+        metrics.incr("idempotency.replayed")
+        return copy.deepcopy(entry["response"])
+
+    def save(self, key: str, fingerprint: str, response: Dict) -> None:
+        size = _approx_size(response)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._evict_expired(now)
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._bytes -= previous["size"]
+            self._entries[key] = {
+                "fingerprint": fingerprint,
+                "response": copy.deepcopy(response),
+                "expires_at": now + self.ttl_seconds,
+                "size": size
+            }
+            self._bytes += size
+            # Drop least recently used entries until both bounds hold
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted["size"]
+        metrics.incr("idempotency.stored")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
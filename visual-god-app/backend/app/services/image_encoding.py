@@ -0,0 +1,81 @@
+# File: visual-god-app/backend/app/services/image_encoding.py
+
+import io
+import os
+from typing import Dict, List
+
+from PIL import Image
+
+try:
+    # Registers the AVIF codec with Pillow when the plugin is installed
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+DEFAULT_OUTPUT_FORMAT = os.getenv("DEFAULT_OUTPUT_FORMAT", "jpeg")
+# "max" keeps the legacy JPEG output (quality 95, optimize); pick a lighter preset per request or here
+DEFAULT_ENCODE_PRESET = os.getenv("DEFAULT_ENCODE_PRESET", "max")
+
+# Pillow save() options per output format and preset.
+# "fast" favours encode time, "small" favours bytes, "max" is the legacy JPEG setting.
+ENCODE_PRESETS: Dict[str, Dict[str, dict]] = {
+    "jpeg": {
+        "fast": {"quality": 85},
+        "balanced": {"quality": 90},
+        "small": {"quality": 80, "optimize": True},
+        "max": {"quality": 95, "optimize": True},
+    },
+    "progressive_jpeg": {
+        "fast": {"quality": 85, "progressive": True},
+        "balanced": {"quality": 90, "progressive": True},
+        "small": {"quality": 80, "progressive": True, "optimize": True},
+        "max": {"quality": 95, "progressive": True, "optimize": True},
+    },
+    "webp": {
+        "fast": {"quality": 80, "method": 0},
+        "balanced": {"quality": 82, "method": 4},
+        "small": {"quality": 75, "method": 6},
+        "max": {"quality": 92, "method": 4},
+    },
+    "avif": {
+        "fast": {"quality": 60, "speed": 8},
+        "balanced": {"quality": 60, "speed": 6},
+        "small": {"quality": 50, "speed": 4},
+        "max": {"quality": 80, "speed": 6},
+    },
+}
+
+# Pillow format name and MIME type for each output format
+FORMAT_INFO = {
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "progressive_jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "webp": ("WEBP", "image/webp", "webp"),
+    "avif": ("AVIF", "image/avif", "avif"),
+}
+
+
+def available_formats() -> List[str]:
+    """Output formats the installed Pillow build can encode"""
+    Image.init()
+    return [name for name, (pil_format, _, _) in FORMAT_INFO.items() if pil_format in Image.SAVE]
+
+
+def mime_type(output_format: str) -> str:
+    return FORMAT_INFO.get(output_format, FORMAT_INFO["jpeg"])[1]
+
+
+def file_extension(output_format: str) -> str:
+    return FORMAT_INFO.get(output_format, FORMAT_INFO["jpeg"])[2]
+
+
+def encode_image(image: Image.Image, output_format: str = DEFAULT_OUTPUT_FORMAT,
+                 encode_preset: str = DEFAULT_ENCODE_PRESET) -> bytes:
+    """Encode an RGB image with the chosen format and speed/size preset"""
+    if output_format not in FORMAT_INFO:
+        raise ValueError(f"Unsupported output_format: {output_format}")
+    presets = ENCODE_PRESETS[output_format]
+    if encode_preset not in presets:
+        raise ValueError(f"Unsupported encode_preset: {encode_preset}")
+    buffer = io.BytesIO()
+    image.save(buffer, format=FORMAT_INFO[output_format][0], **presets[encode_preset])
+    return buffer.getvalue()
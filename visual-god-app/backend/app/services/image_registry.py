@@ -0,0 +1,142 @@
+# File: visual-god-app/backend/app/services/image_registry.py
+
+import base64
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import threading
+import uuid
+import weakref
+from typing import Dict, List, Optional
+
+# Decoded images above this size are spilled to an mmap'd temp file
+IMAGE_SPILL_THRESHOLD_BYTES = int(os.getenv("IMAGE_SPILL_THRESHOLD_BYTES", str(2 * 1024 * 1024)))
+
+
+class _StoredImage:
+    """One decoded image, held either as bytes or in an anonymous temp file"""
+
+    def __init__(self, data: bytes):
+        self.size = len(data)
+        self._data: Optional[bytes] = None
+        self._file = None
+        # Live readers handed out by open(); Pillow never closes the streams it is given.
+        # Held weakly so finished readers are unmapped as soon as they are dropped.
+        self._maps: "weakref.WeakSet[mmap.mmap]" = weakref.WeakSet()
+        if self.size > IMAGE_SPILL_THRESHOLD_BYTES:
+            self._file = tempfile.TemporaryFile(prefix="visual-god-img-")
+            self._file.write(data)
+            self._file.flush()
+        else:
+            self._data = data
+
+    def open(self):
+        """Fresh file-like reader; each caller gets its own position"""
+        if self._file is not None:
+            mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.add(mapped)
+            return mapped
+        return io.BytesIO(self._data)
+
+    def read(self) -> bytes:
+        if self._file is not None:
+            with self.open() as mapped:
+                return mapped[:]
+        return self._data
+
+    def close(self) -> None:
+        for mapped in list(self._maps):
+            try:
+                mapped.close()
+            except BufferError:
+                pass  # Still exported somewhere; released when that view goes away
+        self._maps.clear()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._data = None
+
+
+_lock = threading.Lock()
+_images: Dict[str, _StoredImage] = {}
+
+
+class ImageRegistry:
+    """Request-scoped image store.
+
+    Each upload is decoded once; graph state only carries the lightweight
+    reference returned by register(). Closing the registry frees every image
+    it registered.
+    """
+
+    def __init__(self):
+        self._handles: List[str] = []
+
+    def register(self, image_base64: str, filename: str, index: int) -> Dict:
+        data = base64.b64decode(image_base64)
+        handle = uuid.uuid4().hex
+        stored = _StoredImage(data)
+        with _lock:
+            _images[handle] = stored
+        self._handles.append(handle)
+        return {
+            "handle": handle,
+            "filename": filename,
+            "index": index,
+            "digest": hashlib.sha256(data).hexdigest(),
+            "size": stored.size
+        }
+
+    def register_all(self, image_data_list: List[Dict]) -> List[Dict]:
+        return [
+            self.register(img["base64"], img.get("filename", f"image_{i}"), i)
+            for i, img in enumerate(image_data_list)
+        ]
+
+    def close(self) -> None:
+        with _lock:
+            stored = [_images.pop(h, None) for h in self._handles]
+        for image in stored:
+            if image is not None:
+                image.close()
+        self._handles = []
+
+    def __enter__(self) -> "ImageRegistry":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _lookup(handle: str) -> _StoredImage:
+    with _lock:
+        stored = _images.get(handle)
+    if stored is None:
+        raise KeyError(f"Unknown or released image handle: {handle}")
+    return stored
+
+
+def open_image_stream(image_ref: Dict):
+    """File-like reader for an image reference (or a legacy base64 payload)"""
+    if "handle" in image_ref:
+        return _lookup(image_ref["handle"]).open()
+    return io.BytesIO(base64.b64decode(image_ref["base64"]))
+
+
+def get_image_bytes(image_ref: Dict) -> bytes:
+    if "handle" in image_ref:
+        return _lookup(image_ref["handle"]).read()
+    return base64.b64decode(image_ref["base64"])
+
+
+def get_image_base64(image_ref: Dict) -> str:
+    if "handle" in image_ref:
+        return base64.b64encode(_lookup(image_ref["handle"]).read()).decode("utf-8")
+    return image_ref["base64"]
+
+
+def to_payload(image_ref: Dict) -> Dict:
+    """Expand a reference back into the {base64, filename} shape clients expect"""
+    return {"base64": get_image_base64(image_ref), "filename": image_ref.get("filename")}
@@ -0,0 +1,75 @@
+# File: visual-god-app/backend/app/services/json_stream.py
+
+import json
+import math
+from typing import Any, Dict, Iterator
+
+try:
+    # Several times faster than json and encodes straight to bytes (requirements.txt)
+    import orjson
+except ImportError:
+    orjson = None
+
+# Generated base64 needs no JSON escaping, so it is written straight from the stored string
+BASE64_FIELDS = ("image_base64", "preview_base64")
+
+
+def _finite(obj: Any) -> Any:
+    """Copy of obj with NaN/Infinity replaced by None"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON, matching FastAPI's JSONResponse output.
+
+    NaN and Infinity are written as null (as orjson does) rather than as the
+    bare tokens stdlib json emits, which are not valid JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    try:
+        encoded = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str, allow_nan=False)
+    except ValueError:
+        encoded = json.dumps(_finite(obj), ensure_ascii=False, separators=(",", ":"), default=str)
+    return encoded.encode("utf-8")
+
+
+def _iter_item(item: Dict) -> Iterator[bytes]:
+    raw = {k: v for k, v in item.items() if k in BASE64_FIELDS and isinstance(v, str)}
+    head = dumps({k: v for k, v in item.items() if k not in raw})
+    if not raw:
+        yield head
+        return
+    yield head[:-1]
+    separator = b"," if len(head) > 2 else b""
+    for key, value in raw.items():
+        yield separator + b'"' + key.encode("ascii") + b'":"'
+        yield value.encode("ascii")
+        yield b'"'
+        separator = b","
+    yield b"}"
+
+
+def iter_json(obj: Dict, stream_key: str = "generated_images") -> Iterator[bytes]:
+    """Serialize obj as one JSON object, emitting obj[stream_key] one list item at a time.
+
+    Only one item's encoded bytes exist at once, instead of the whole
+    document as a single string.
+    """
+    items = obj.get(stream_key)
+    if not isinstance(items, list):
+        yield dumps(obj)
+        return
+    head = dumps({k: v for k, v in obj.items() if k != stream_key})
+    yield head[:-1] + (b"," if len(head) > 2 else b"") + b'"' + stream_key.encode("ascii") + b'":['
+    for i, item in enumerate(items):
+        if i:
+            yield b","
+        yield from _iter_item(item)
+    yield b"]}"
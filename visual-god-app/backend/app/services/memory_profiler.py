@@ -0,0 +1,172 @@
+# File: visual-god-app/backend/app/services/memory_profiler.py
+
+import contextvars
+import functools
+import hmac
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, List, Optional
+
+MEMORY_PROFILING = os.getenv("MEMORY_PROFILING", "0") == "1"
+# Secret that X-Profile-Memory and /api/debug/memory must present; unset disables both
+MEMORY_PROFILING_TOKEN = os.getenv("MEMORY_PROFILING_TOKEN", "")
+MEMORY_PROFILE_HISTORY = int(os.getenv("MEMORY_PROFILE_HISTORY", "20"))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux); None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class MemoryProfile:
+    """Per-stage tracemalloc peaks and RSS deltas for one request.
+
+    tracemalloc is process-wide, so stages of requests profiled at the same
+    time see each other's allocations; `overlapping_profiles` flags that.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.stages: List[Dict] = []
+        self.started_at = time.time()
+        self.rss_start = rss_bytes()
+        self.rss_end: Optional[int] = None
+        self.traced_start = 0
+        self.peak_bytes = 0  # Highest traced total seen, absolute
+        self.overlapping_profiles = 0
+        # Open stages per thread: [start_current, highest peak seen by finished children]
+        self._stacks: Dict[int, List[List[int]]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        stack = self._stacks.setdefault(threading.get_ident(), [])
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # The parent's peak so far would be lost by the reset below
+            stack[-1][1] = max(stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        frame = [current, current]
+        stack.append(frame)
+        rss_before = rss_bytes()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            end_current, peak = tracemalloc.get_traced_memory()
+            stack.pop()
+            stage_peak = max(peak, frame[1])
+            if stack:
+                stack[-1][1] = max(stack[-1][1], stage_peak)
+            rss_after = rss_bytes()
+            with self._lock:
+                self.peak_bytes = max(self.peak_bytes, stage_peak)
+                self.stages.append({
+                    "stage": name,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "traced_peak_bytes": stage_peak - frame[0],
+                    "traced_delta_bytes": end_current - frame[0],
+                    "rss_delta_bytes": rss_after - rss_before if rss_after is not None and rss_before is not None else None,
+                    "rss_after_bytes": rss_after
+                })
+
+    def report(self) -> Dict:
+        with self._lock:
+            return {
+                "label": self.label,
+                "started_at": self.started_at,
+                "traced_peak_bytes": max(0, self.peak_bytes - self.traced_start),
+                "rss_start_bytes": self.rss_start,
+                "rss_end_bytes": self.rss_end,
+                "overlapping_profiles": self.overlapping_profiles,
+                "stages": list(self.stages)
+            }
+
+
+_current_profile: contextvars.ContextVar[Optional[MemoryProfile]] = contextvars.ContextVar("memory_profile", default=None)
+_active: List[MemoryProfile] = []
+_active_lock = threading.Lock()
+_started_tracemalloc = False
+recent_profiles: Deque[Dict] = deque(maxlen=MEMORY_PROFILE_HISTORY)
+
+
+def token_valid(token: Optional[str]) -> bool:
+    """Whether token matches MEMORY_PROFILING_TOKEN (never, when none is configured)"""
+    if not MEMORY_PROFILING_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.strip().encode("utf-8"), MEMORY_PROFILING_TOKEN.encode("utf-8"))
+
+
+def profiling_requested(header_value: Optional[str]) -> bool:
+    """Profile when enabled for every request, or when X-Profile-Memory carries the token.
+
+    tracemalloc slows every allocation in the process, so clients cannot turn it on freely.
+    """
+    return MEMORY_PROFILING or token_valid(header_value)
+
+
+@contextmanager
+def memory_profile(label: str, enabled: bool = True):
+    """Profile stages run inside the block (including worker threads that copy the context)"""
+    global _started_tracemalloc
+    if not enabled:
+        yield None
+        return
+    profile = MemoryProfile(label)
+    with _active_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+        for other in _active:
+            other.overlapping_profiles += 1
+        profile.overlapping_profiles = len(_active)
+        _active.append(profile)
+    profile.traced_start, _ = tracemalloc.get_traced_memory()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        _, peak = tracemalloc.get_traced_memory()
+        with profile._lock:
+            profile.peak_bytes = max(profile.peak_bytes, peak)
+        profile.rss_end = rss_bytes()
+        with _active_lock:
+            _active.remove(profile)
+            # Tracing slows every allocation; only keep it on while someone is profiling
+            if not _active and _started_tracemalloc:
+                tracemalloc.stop()
+                _started_tracemalloc = False
+        recent_profiles.append(profile.report())
+
+
+@contextmanager
+def profile_stage(name: str):
+    """Record a stage on the request's profile; no-op when profiling is off"""
+    profile = _current_profile.get()
+    if profile is None or not tracemalloc.is_tracing():
+        yield
+        return
+    with profile.stage(name):
+        yield
+
+
+def profiled(name: str) -> Callable:
+    """Decorator recording each call as a stage"""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with profile_stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
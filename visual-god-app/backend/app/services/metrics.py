@@ -0,0 +1,27 @@
+# File: visual-god-app/backend/app/services/metrics.py
+
+import threading
+from typing import Dict, Union
+
+Number = Union[int, float]
+
+_lock = threading.Lock()
+_counters: Dict[str, Number] = {}
+
+
+def incr(name: str, amount: Number = 1) -> None:
+    """Increment a process-wide counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def get(name: str) -> Number:
+    """Read a single counter (0 if it was never incremented)"""
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot() -> Dict[str, Number]:
+    """Copy of all counters, for /api/metrics and /health"""
+    with _lock:
+        return dict(_counters)
@@ -0,0 +1,75 @@
+# File: visual-god-app/backend/app/services/prescreen.py
+
+import os
+import warnings
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from services.image_registry import open_image_stream
+
+# Local checks that run before any paid vision call (all overridable via env)
+PRESCREEN_ENABLED = os.getenv("PRESCREEN_ENABLED", "1") == "1"
+PRESCREEN_MAX_BYTES = int(os.getenv("PRESCREEN_MAX_BYTES", str(10 * 1024 * 1024)))
+PRESCREEN_MAX_PIXELS = int(os.getenv("PRESCREEN_MAX_PIXELS", str(50_000_000)))
+PRESCREEN_MIN_SIDE = int(os.getenv("PRESCREEN_MIN_SIDE", "256"))
+PRESCREEN_MIN_STDDEV = float(os.getenv("PRESCREEN_MIN_STDDEV", "4.0"))
+PRESCREEN_MIN_SHARPNESS = float(os.getenv("PRESCREEN_MIN_SHARPNESS", "5.0"))
+
+# Analysis runs on a grayscale thumbnail so cost is independent of upload size
+ANALYSIS_SIZE = (512, 512)
+
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """Variance of the 4-neighbour Laplacian; low values mean a blurry image"""
+    lap = (
+        gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1]
+        - 4.0 * gray[1:-1, 1:-1]
+    )
+    return float(lap.var())
+
+
+def prescreen_image(image_ref: Dict) -> Tuple[Optional[str], Dict]:
+    """Cheap local checks; returns (rejection_reason or None, scores)"""
+    scores: Dict = {}
+
+    size = image_ref.get("size")
+    if size is not None and size > PRESCREEN_MAX_BYTES:
+        return f"File is too large ({size // (1024 * 1024)}MB, max {PRESCREEN_MAX_BYTES // (1024 * 1024)}MB)", scores
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            # Image.open only parses the header; pixels are decoded later
+            image = Image.open(open_image_stream(image_ref))
+            width, height = image.size
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        return "Image dimensions are too large", scores
+    except Exception:
+        return "File is not a readable image", scores
+
+    scores.update({"width": width, "height": height})
+    if width * height > PRESCREEN_MAX_PIXELS:
+        return f"Image dimensions are too large ({width}x{height})", scores
+    if min(width, height) < PRESCREEN_MIN_SIDE:
+        return f"Image resolution is too low ({width}x{height}, minimum {PRESCREEN_MIN_SIDE}px per side)", scores
+
+    try:
+        # JPEG draft mode decodes straight to a reduced scale
+        image.draft("L", ANALYSIS_SIZE)
+        image = image.convert("L")
+        image.thumbnail(ANALYSIS_SIZE)
+        gray = np.asarray(image, dtype=np.float32)
+    except Exception:
+        return "File is not a readable image", scores
+
+    stddev = float(gray.std())
+    sharpness = laplacian_variance(gray)
+    scores.update({"stddev": round(stddev, 2), "sharpness": round(sharpness, 2)})
+
+    if stddev < PRESCREEN_MIN_STDDEV:
+        return "Image is blank or a solid colour", scores
+    if sharpness < PRESCREEN_MIN_SHARPNESS:
+        return "Image is too blurry", scores
+    return None, scores
@@ -0,0 +1,86 @@
+# File: visual-god-app/backend/app/services/rendition_store.py
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from services import metrics
+
+RENDITION_TTL_SECONDS = float(os.getenv("RENDITION_TTL_SECONDS", "3600"))
+RENDITION_MAX_BYTES = int(os.getenv("RENDITION_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class RenditionStore:
+    """Generated source images whose full-resolution rendition is encoded on first fetch.
+
+    Entries are evicted least-recently-used once the byte budget is exceeded,
+    and expire after the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float = RENDITION_TTL_SECONDS, max_bytes: int = RENDITION_MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, source: bytes, render: Callable[[bytes], bytes], mime_type: str) -> str:
+        """Keep the generated source; render(source) produces the full rendition later"""
+        image_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[image_id] = {
+                "source": source,
+                "render": render,
+                "mime_type": mime_type,
+                "rendition": None,
+                "expires_at": time.monotonic() + self.ttl_seconds,
+                "size": len(source)
+            }
+            self._bytes += len(source)
+            self._evict()
+        return image_id
+
+    def get(self, image_id: str) -> Optional[Tuple[bytes, str]]:
+        """Full rendition bytes and MIME type, encoding them on first request"""
+        with self._lock:
+            entry = self._entries.get(image_id)
+            if entry is None or entry["expires_at"] <= time.monotonic():
+                return None
+            self._entries.move_to_end(image_id)
+            if entry["rendition"] is not None:
+                metrics.incr("renditions.cache_hits")
+                return entry["rendition"], entry["mime_type"]
+            source, render, mime_type = entry["source"], entry["render"], entry["mime_type"]
+
+        # Encode outside the lock; a concurrent duplicate encode is harmless
+        rendition = render(source)
+        metrics.incr("renditions.encoded")
+        with self._lock:
+            entry = self._entries.get(image_id)
+            if entry is not None and entry["rendition"] is None:
+                # The rendition replaces the source, which is no longer needed
+                entry["rendition"] = rendition
+                entry["source"] = None
+                self._bytes += len(rendition) - entry["size"]
+                entry["size"] = len(rendition)
+                self._evict()
+        return rendition, mime_type
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if e["expires_at"] <= now]:
+            self._bytes -= self._entries.pop(key)["size"]
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted["size"]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+# Shared by the agent (producer) and GET /api/images/{id} (consumer)
+rendition_store = RenditionStore()
@@ -0,0 +1,70 @@
+# File: visual-god-app/backend/app/services/single_flight.py
+
+import asyncio
+import copy
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services import metrics
+from services.idempotency import IdempotencyConflict
+
+
+def request_digest(images: List[Dict], **params: Any) -> str:
+    """Digest of the uploaded image bytes plus the generation parameters"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    for img in images:
+        digest.update(b"\x00")
+        digest.update(str(img.get("filename", "")).encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(img.get("base64", "").encode("ascii", errors="ignore"))
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls onto one in-flight task.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task. Every caller receives its own copy of
+    the result (strings are shared, containers are not).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._fingerprints: Dict[str, Optional[str]] = {}
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], fingerprint: Optional[str] = None) -> Tuple[Any, bool]:
+        """Run fn() once per key; returns (result, coalesced).
+
+        When the key is not derived from the request body (an Idempotency-Key),
+        pass the body fingerprint: attaching with a different one raises
+        IdempotencyConflict instead of handing back another request's result.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            if fingerprint != self._fingerprints.get(key):
+                raise IdempotencyConflict("Idempotency-Key is in use by a request with a different body")
+            metrics.incr(f"{self.name}.coalesced")
+            # Shield so a disconnecting follower never cancels the shared work
+            result = await asyncio.shield(task)
+            return copy.deepcopy(result), True
+
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        self._fingerprints[key] = fingerprint
+
+        def _forget(done: asyncio.Future) -> None:
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+                del self._fingerprints[key]
+
+        task.add_done_callback(_forget)
+        metrics.incr(f"{self.name}.started")
+        # Callers decorate their copy (session id, size labels) independently
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result), False
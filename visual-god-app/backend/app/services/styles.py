@@ -0,0 +1,67 @@
+# File: visual-god-app/backend/app/services/styles.py
+
+from typing import Dict, List, Optional
+
+# style_id -> {"label", "template", "aliases", "quality", "generation_size"}
+# quality / generation_size of None fall back to the platform plan
+STYLE_REGISTRY: Dict[str, Dict] = {}
+
+
+def register_style(style_id: str, label: str, template: str, aliases: Optional[List[str]] = None,
+                   quality: Optional[str] = None, generation_size: Optional[str] = None) -> None:
+    """Add (or replace) a prompt style; template receives {product_name}"""
+    STYLE_REGISTRY[style_id] = {
+        "label": label,
+        "template": template,
+        "aliases": aliases or [],
+        "quality": quality,
+        "generation_size": generation_size
+    }
+
+
+def resolve_styles(styles: Optional[List[str]]) -> List[str]:
+    """Map requested style ids/aliases to registry ids; None selects every style"""
+    if not styles:
+        return list(STYLE_REGISTRY.keys())
+    lookup = {}
+    for style_id, style in STYLE_REGISTRY.items():
+        lookup[style_id] = style_id
+        for alias in style["aliases"]:
+            lookup[alias] = style_id
+    resolved = []
+    for name in styles:
+        if name not in lookup:
+            raise ValueError(f"Unknown style '{name}'. Must be one of: {list(lookup.keys())}")
+        if lookup[name] not in resolved:
+            resolved.append(lookup[name])
+    return resolved
+
+
+def describe_styles() -> Dict[str, Dict]:
+    """Public view of the registry for /api/styles"""
+    return {
+        style_id: {
+            "label": style["label"],
+            "aliases": style["aliases"],
+            "quality": style["quality"],
+            "generation_size": style["generation_size"]
+        }
+        for style_id, style in STYLE_REGISTRY.items()
+    }
+
+
+register_style(
+    "style_1", "Giant product on a city crosswalk",
+    "A surreal, bird's-eye view of a city street pedestrian crossing, filled with tiny, realistic people walking in various directions. In the center of the crosswalk lies a giant {product_name}, replacing the crosswalk stripes or interacting with them as if it's part of the scene. The perspective should make the product look enormous in comparison to the people. The style should be ultra-realistic with slight artistic exaggeration, with good lighting and detailed shadows cast by the product and people, similar to a high-end street photography shot.",
+    aliases=["crosswalk"]
+)
+register_style(
+    "style_2", "3D billboard at a night-time intersection",
+    "A hyper-realistic nighttime city intersection with a massive, curved 3D digital billboard on the side of a modern building. The billboard displays a dynamic 3D advertisement of a floating {product_name}, emerging slightly out of the screen as if it's interacting with the real world. The product is well-lit with cinematic lighting, surrounded by subtle particles and visual effects that emphasize the product's key features. Pedestrians below are watching or walking by, giving a sense of scale and realism. The overall atmosphere is futuristic, premium, and similar to Times Square or Piccadilly Circus LED displays.",
+    aliases=["billboard"]
+)
+register_style(
+    "style_3", "Editorial catalog layout",
+    "Create a clean, high-end editorial product layout featuring {product_name}, inspired by premium sneaker and fashion catalog designs. The composition should include: A large, detailed top-down product view on the right side of the image. A cluster of 3 to 4 angled or stacked product views in the bottom-left area. A minimalist light background (off-white or neutral gray), with soft shadows and clean studio lighting. No text or logos anywhere in the image. The layout should feel like a modern fashion magazine or product showcase, balanced and highly aesthetic, with careful placement and visual harmony. Use photorealistic lighting, professional product rendering style, and subtle depth and shadows.",
+    aliases=["editorial"]
+)
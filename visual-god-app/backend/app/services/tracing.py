@@ -0,0 +1,271 @@
+# File: visual-god-app/backend/app/services/tracing.py
+
+import contextvars
+import functools
+import json
+import os
+import queue
+import re
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "0") == "1"
+# "file" appends JSON lines to TRACE_FILE, "otlp" posts OTLP/HTTP JSON to TRACE_OTLP_ENDPOINT
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "file")
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(tempfile.gettempdir(), "visual-god-traces.jsonl"))
+# Past this size TRACE_FILE is rotated to TRACE_FILE.1 (one previous file is kept)
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(50 * 1024 * 1024)))
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "visual-god-backend")
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "2"))
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def parse_trace_headers(traceparent: Optional[str], trace_id: Optional[str]) -> Tuple[str, Optional[str]]:
+    """(trace_id, parent_span_id) from a W3C traceparent or X-Trace-Id header; new id if neither is usable"""
+    match = _TRACEPARENT.match((traceparent or "").strip().lower())
+    if match:
+        return match.group(1), match.group(2)
+    candidate = (trace_id or "").strip().lower().replace("-", "")
+    if _TRACE_ID.match(candidate):
+        return candidate, None
+    return new_trace_id(), None
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.events: List[Dict] = []
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def incr(self, key: str, amount: int = 1) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def event(self, name: str, **attributes) -> None:
+        self.events.append({"name": name, "time_unix_nano": time.time_ns(), "attributes": attributes})
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 2),
+            "status": self.status,
+            "attributes": self.attributes,
+            "events": self.events
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_parent() -> Optional[Dict[str, str]]:
+    """Trace/span ids of the active span, for carrying in graph state"""
+    active = _current_span.get()
+    return {"trace_id": active.trace_id, "span_id": active.span_id} if active else None
+
+
+@contextmanager
+def span(name: str, parent: Optional[Dict[str, str]] = None, trace_id: Optional[str] = None, **attributes):
+    """Record a span around the block; nests under the active span, else `parent`, else starts a trace"""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    active = _current_span.get()
+    if active is not None:
+        new = Span(name, active.trace_id, active.span_id, attributes)
+    elif parent:
+        new = Span(name, parent["trace_id"], parent.get("span_id"), attributes)
+    else:
+        new = Span(name, trace_id or new_trace_id(), None, attributes)
+    token = _current_span.set(new)
+    try:
+        yield new
+    except BaseException as e:
+        new.status = "error"
+        new.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        new.end_ns = time.time_ns()
+        _exporter.submit(new)
+
+
+def traced(name: str) -> Callable:
+    """Decorator recording a span named `name` around each call"""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_node(fn: Callable[[Dict], Dict]) -> Callable[[Dict], Dict]:
+    """Wrap a graph node in a span; falls back to the trace carried in state"""
+    @functools.wraps(fn)
+    def wrapper(state: Dict) -> Dict:
+        with span(f"node.{fn.__name__}", parent=state.get("trace_parent")) as node_span:
+            result = fn(state)
+            if node_span is not None and isinstance(result, dict):
+                node_span.set(current_step=result.get("current_step"))
+            return result
+    return wrapper
+
+
+def submit_in_context(pool, fn: Callable, *args):
+    """ThreadPoolExecutor.submit that keeps the active span for the worker thread"""
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+# === httpx hooks: byte counts and retries on the active span ===
+def _on_request(request: httpx.Request) -> None:
+    active = _current_span.get()
+    if active is None:
+        return
+    active.incr("http.attempts")
+    active.incr("http.request_bytes", int(request.headers.get("content-length", 0)))
+    active.event("http.request", method=request.method, path=request.url.path)
+
+
+def _on_response(response: httpx.Response) -> None:
+    active = _current_span.get()
+    if active is None:
+        return
+    response.read()
+    active.incr("http.response_bytes", len(response.content))
+    active.set(**{"http.status_code": response.status_code, "http.retries": active.attributes["http.attempts"] - 1})
+    active.event("http.response", status_code=response.status_code, bytes=len(response.content))
+
+
+def traced_http_client(timeout: float) -> httpx.Client:
+    """httpx client for the OpenAI SDK that reports each attempt on the active span"""
+    return httpx.Client(timeout=timeout, event_hooks={"request": [_on_request], "response": [_on_response]})
+
+
+# === Export ===
+def _otlp_value(value: Any) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+def _otlp_payload(spans: List[Dict]) -> Dict:
+    return {"resourceSpans": [{
+        "resource": {"attributes": _otlp_attributes({"service.name": TRACE_SERVICE_NAME})},
+        "scopeSpans": [{
+            "scope": {"name": "visual-god"},
+            "spans": [{
+                "traceId": s["trace_id"],
+                "spanId": s["span_id"],
+                "parentSpanId": s["parent_span_id"] or "",
+                "name": s["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(s["start_time_unix_nano"]),
+                "endTimeUnixNano": str(s["end_time_unix_nano"]),
+                "attributes": _otlp_attributes(s["attributes"]),
+                "events": [
+                    {"name": e["name"], "timeUnixNano": str(e["time_unix_nano"]), "attributes": _otlp_attributes(e["attributes"])}
+                    for e in s["events"]
+                ],
+                "status": {"code": 2 if s["status"] == "error" else 1}
+            } for s in spans]
+        }]
+    }]}
+
+
+class SpanExporter:
+    """Batches finished spans on a background thread so requests never wait on export"""
+
+    def __init__(self, exporter: str = TRACE_EXPORTER):
+        self.exporter = exporter
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=10000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, finished: Span) -> None:
+        if self.exporter == "none":
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            pass  # Dropping spans beats blocking a request
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + TRACE_FLUSH_SECONDS
+            while len(batch) < 500 and (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.export([s.to_dict() for s in batch])
+            except Exception as e:
+                print(f"⚠️ Trace export failed ({len(batch)} spans dropped): {e}")
+
+    def export(self, spans: List[Dict]) -> None:
+        if self.exporter == "otlp":
+            httpx.post(TRACE_OTLP_ENDPOINT, json=_otlp_payload(spans), timeout=5.0).raise_for_status()
+        else:
+            self._rotate_if_full()
+            with open(TRACE_FILE, "a") as f:
+                for s in spans:
+                    f.write(json.dumps(s, default=str) + "\n")
+
+    @staticmethod
+    def _rotate_if_full() -> None:
+        try:
+            if os.path.getsize(TRACE_FILE) >= TRACE_FILE_MAX_BYTES:
+                os.replace(TRACE_FILE, f"{TRACE_FILE}.1")
+        except FileNotFoundError:
+            pass
+
+
+_exporter = SpanExporter()
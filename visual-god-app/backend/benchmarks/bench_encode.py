@@ -0,0 +1,40 @@
+# File: visual-god-app/backend/benchmarks/bench_encode.py
+# Encode time vs bytes for every output format/preset at each SIZE_CONFIGS resolution.
+#
+#   python benchmarks/bench_encode.py --repeat 3
+
+import argparse
+import base64
+import io
+import time
+
+from PIL import Image
+
+import fake_openai
+from services.image_encoding import ENCODE_PRESETS, available_formats, encode_image
+
+RESOLUTIONS = {"instagram": "1080x1920", "facebook": "1080x1080", "youtube": "2560x1440"}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'platform':<10} {'format':<17} {'preset':<9} {'encode':>9} {'bytes':>10} {'base64':>10}")
+    for platform, size in RESOLUTIONS.items():
+        width, height = map(int, size.split("x"))
+        source = base64.b64decode(fake_openai.make_image_base64(width, height, "PNG"))
+        image = Image.open(io.BytesIO(source)).convert("RGB")
+        for output_format in available_formats():
+            for preset in ENCODE_PRESETS[output_format]:
+                started = time.perf_counter()
+                for _ in range(args.repeat):
+                    encoded = encode_image(image, output_format, preset)
+                elapsed_ms = (time.perf_counter() - started) / args.repeat * 1000
+                b64_len = (len(encoded) + 2) // 3 * 4
+                print(f"{platform:<10} {output_format:<17} {preset:<9} {elapsed_ms:>7.0f}ms {len(encoded):>10,} {b64_len:>10,}")
+
+
+if __name__ == "__main__":
+    main()
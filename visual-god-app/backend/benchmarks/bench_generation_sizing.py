@@ -0,0 +1,43 @@
+# File: visual-god-app/backend/benchmarks/bench_generation_sizing.py
+# Square-then-crop vs native-aspect generation, per platform: pixels thrown away,
+# upscale factor and resize+encode time for the post-processing step.
+#
+#   python benchmarks/bench_generation_sizing.py --repeat 5
+
+import argparse
+import time
+
+import fake_openai
+
+
+def crop_stats(generation_size: str, target_size: str):
+    gen_w, gen_h = map(int, generation_size.split("x"))
+    tgt_w, tgt_h = map(int, target_size.split("x"))
+    # resize_image_to_target scales to cover the target, then center-crops
+    scale = max(tgt_w / gen_w, tgt_h / gen_h)
+    kept = (tgt_w / scale) * (tgt_h / scale)
+    return 1 - kept / (gen_w * gen_h), scale
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    helper = fake_openai.install()
+    print(f"{'platform':<10} {'mode':<7} {'generate at':<11} {'discarded':>9} {'upscale':>8} {'resize+encode':>14}")
+    for platform, target_size in helper.SIZE_MAPPING.items():
+        native = helper.plan_generation_size(platform)["generation_size"]
+        for mode, generation_size in (("square", "1024x1024"), ("native", native)):
+            width, height = map(int, generation_size.split("x"))
+            generated = fake_openai.make_image_base64(width, height, "PNG")
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                helper.resize_image_to_target(generated, target_size)
+            elapsed_ms = (time.perf_counter() - started) / args.repeat * 1000
+            discarded, upscale = crop_stats(generation_size, target_size)
+            print(f"{platform:<10} {mode:<7} {generation_size:<11} {discarded:>8.1%} {upscale:>7.2f}x {elapsed_ms:>12.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# File: visual-god-app/backend/benchmarks/bench_request_memory.py
+# Peak memory of one /api/process-style run with a fake OpenAI client.
+#
+#   python benchmarks/bench_request_memory.py --images 5 --width 3000 --height 4000
+#   python benchmarks/bench_request_memory.py --size youtube --stages   # per-node / per-resize breakdown
+
+import argparse
+import resource
+import time
+import tracemalloc
+
+import fake_openai
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=5)
+    parser.add_argument("--width", type=int, default=3000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--size", default="instagram")
+    parser.add_argument("--stages", action="store_true", help="print the per-stage memory profile")
+    args = parser.parse_args()
+
+    helper = fake_openai.install()
+    from services.memory_profiler import memory_profile
+    images = [
+        {"base64": fake_openai.make_image_base64(args.width, args.height, seed=i), "filename": f"product_{i}.jpg"}
+        for i in range(args.images)
+    ]
+    upload_bytes = sum(len(img["base64"]) for img in images)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    with memory_profile("benchmark", enabled=args.stages) as profile:
+        result = helper.agent.process(images, generate_images=True, image_size=args.size)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(f"images={args.images} upload_base64={upload_bytes / 1e6:.1f}MB success={result['success']}")
+    print(f"tracemalloc_peak={peak / 1e6:.1f}MB ({peak / upload_bytes:.2f}x upload)")
+    print(f"ru_maxrss_growth={(rss_after - rss_before) / 1024:.1f}MB elapsed={elapsed:.2f}s")
+
+    if profile is not None:
+        print(f"{'stage':<45} {'ms':>8} {'peak MB':>9} {'delta MB':>9} {'rss MB':>8}")
+        for stage in profile.report()["stages"]:
+            rss_delta = stage["rss_delta_bytes"]
+            print(f"{stage['stage']:<45} {stage['duration_ms']:>8.1f} {stage['traced_peak_bytes'] / 1e6:>9.1f} "
+                  f"{stage['traced_delta_bytes'] / 1e6:>9.1f} {(rss_delta or 0) / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# File: visual-god-app/backend/benchmarks/bench_serialize.py
+# Serialization time and peak memory of a 15-image /api/process response:
+# response_model validation + JSONResponse (previous path) vs. the streamed path.
+#
+#   python benchmarks/bench_serialize.py --images 15 --size youtube
+
+import argparse
+import time
+import tracemalloc
+
+import fake_openai
+
+SIZES = {"instagram": (1080, 1920), "facebook": (1080, 1080), "youtube": (2560, 1440)}
+
+
+def make_result(images: int, width: int, height: int) -> dict:
+    return {
+        "success": True,
+        "descriptions": ["product"] * (images // 3),
+        "products": [
+            {"product_name": f"Product {i}", "product_type": "beverage", "brand_name": None}
+            for i in range(images // 3)
+        ],
+        "prompts": [f"prompt {i}" for i in range(images)],
+        "generated_images": [
+            {
+                "prompt": f"prompt {i}",
+                "image_base64": fake_openai.make_image_base64(width, height, seed=i),
+                "index": i,
+                "input_image": f"product_{i // 3}.jpg",
+                "size": f"{width}x{height}",
+                "mime_type": "image/jpeg",
+                "product_name": f"Product {i // 3}",
+                "prompt_type": f"style_{i % 3 + 1}",
+                "timings_ms": {"generation": 0, "resize_encode": 0}
+            }
+            for i in range(images)
+        ],
+        "message": "benchmark"
+    }
+
+
+def serialize_validated(api, result: dict) -> int:
+    from fastapi.responses import JSONResponse
+    content = api.ProcessResponse.model_validate(result).model_dump(mode="json")
+    return len(JSONResponse(content).body)
+
+
+def serialize_streamed(api, result: dict) -> int:
+    return sum(len(chunk) for chunk in api.iter_json(api.shape_process_response(result)))
+
+
+def measure(fn, api, result: dict):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = fn(api, result)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=15)
+    parser.add_argument("--size", default="youtube", choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fake_openai.install()
+    import main as api
+    from services import json_stream
+
+    result = make_result(args.images, *SIZES[args.size])
+    payload = sum(len(img["image_base64"]) for img in result["generated_images"])
+    print(f"images={args.images} size={args.size} base64_payload={payload / 1e6:.1f}MB "
+          f"serializer={'orjson' if json_stream.orjson else 'json'}")
+
+    for label, fn in (("validated+JSONResponse", serialize_validated), ("streamed", serialize_streamed)):
+        runs = [measure(fn, api, result) for _ in range(args.repeat)]
+        size = runs[0][0]
+        best = min(r[1] for r in runs)
+        peak = max(r[2] for r in runs)
+        print(f"{label:<24} body={size / 1e6:.1f}MB best={best * 1000:.1f}ms "
+              f"peak_alloc={peak / 1e6:.1f}MB ({peak / payload:.2f}x payload)")
+
+
+if __name__ == "__main__":
+    main()
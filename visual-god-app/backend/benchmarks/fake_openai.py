@@ -0,0 +1,63 @@
+# File: visual-god-app/backend/benchmarks/fake_openai.py
+# Offline stand-in for the OpenAI client so benchmarks measure our own code paths.
+
+import base64
+import io
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+from PIL import Image
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+VALIDATION_JSON = json.dumps({
+    "is_product": True,
+    "category": "product",
+    "confidence": 0.95,
+    "description": "A bottle of sparkling water on a table",
+    "product_name": "Sparkling Water",
+    "product_type": "beverage",
+    "rejection_reason": None
+})
+
+
+def make_image_base64(width: int, height: int, fmt: str = "JPEG", seed: int = 0) -> str:
+    """Noisy synthetic photo so encoders and decoders do realistic work"""
+    image = Image.effect_noise((width, height), 40 + seed % 30).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=90)
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+class FakeOpenAI:
+    def __init__(self, vision_latency: float = 0.0, edit_latency: float = 0.0):
+        self.vision_latency = vision_latency
+        self.edit_latency = edit_latency
+        self.chat_requests = []  # kwargs (minus messages) of each chat.completions.create call
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+        self.images = SimpleNamespace(edit=self._edit)
+
+    def _chat(self, **kwargs):
+        time.sleep(self.vision_latency)
+        # Without messages: they carry the image as base64 and would skew memory benchmarks
+        self.chat_requests.append({k: v for k, v in kwargs.items() if k != "messages"})
+        message = SimpleNamespace(content=VALIDATION_JSON, refusal=None)
+        usage = SimpleNamespace(prompt_tokens=300, completion_tokens=60, total_tokens=360)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    def _edit(self, size: str = "1024x1024", **kwargs):
+        time.sleep(self.edit_latency)
+        width, height = map(int, size.split("x"))
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=make_image_base64(width, height, "PNG"))])
+
+
+def install(vision_latency: float = 0.0, edit_latency: float = 0.0):
+    """Patch the agent module to use the fake client; returns the module"""
+    from services import content_agent_helper
+    fake = FakeOpenAI(vision_latency, edit_latency)
+    content_agent_helper.get_openai_client = lambda: fake
+    return content_agent_helper
@@ -0,0 +1,27 @@
+# File: visual-god-app/backend/tests/conftest.py
+
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("TRACING_ENABLED", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import fake_openai  # noqa: E402  (also puts app/ on sys.path)
+
+fake_openai.install()
+
+
+@pytest.fixture(scope="session")
+def api():
+    import main
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(api):
+    from fastapi.testclient import TestClient
+    # One client (and event loop) for the session; module-level asyncio primitives bind to it
+    with TestClient(api.app) as test_client:
+        yield test_client
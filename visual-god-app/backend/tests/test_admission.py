@@ -0,0 +1,118 @@
+# File: visual-god-app/backend/tests/test_admission.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import fake_openai
+
+PRODUCT_IMAGE = fake_openai.make_image_base64(512, 512)
+
+
+def wait_until_idle(api, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while api.admission.stats()["inflight_generations"] and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert api.admission.stats()["inflight_generations"] == 0
+
+
+def test_generate_only_timeout_keeps_slots_until_edits_finish(client, api, monkeypatch):
+    from services import content_agent_helper
+    fake = content_agent_helper.get_openai_client()
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+    edit = fake.images.edit
+
+    def slow_edit(**kwargs):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        try:
+            time.sleep(0.5)
+            return edit(**kwargs)
+        finally:
+            with lock:
+                running["now"] -= 1
+
+    monkeypatch.setattr(fake.images, "edit", slow_edit)
+    monkeypatch.setattr(api, "GENERATE_TIMEOUT_SECONDS", 0.1)
+    monkeypatch.setattr(api.admission, "max_inflight", 1)
+    body = {"prompts": ["a bottle on a table"], "images": [{"base64": PRODUCT_IMAGE, "filename": "p.jpg"}],
+            "max_images": 1, "image_size": "facebook"}
+
+    for _ in range(3):
+        result = client.post("/api/generate-only", json=body).json()
+        assert result["success"] is False
+        # The timed-out run still holds its slot while its edit is running
+        assert api.admission.stats()["inflight_generations"] <= 1
+
+    wait_until_idle(api)
+    assert running["max"] == 1
+
+
+def test_generate_only_idempotency_keys_are_scoped_per_user(client):
+    body = {"prompts": ["a bottle on a table"], "images": [{"base64": PRODUCT_IMAGE, "filename": "p.jpg"}],
+            "max_images": 1, "image_size": "facebook"}
+    headers = {"Idempotency-Key": "shared-key"}
+
+    first = client.post("/api/generate-only", json={**body, "userId": "user-a"}, headers=headers)
+    repeat = client.post("/api/generate-only", json={**body, "userId": "user-a"}, headers=headers)
+    other = client.post("/api/generate-only", json={**body, "userId": "user-b"}, headers=headers)
+
+    assert first.json()["success"] is True
+    assert repeat.headers.get("Idempotent-Replayed") == "true"
+    # Another user reusing the key gets their own run, not user-a's images
+    assert "Idempotent-Replayed" not in other.headers
+    assert other.json()["success"] is True
+
+
+def test_waiting_users_are_served_round_robin():
+    from services.admission import AdmissionController
+
+    async def scenario():
+        controller = AdmissionController(max_inflight=1, max_queue=10)
+        order = []
+        release_holder = asyncio.Event()
+
+        async def holder():
+            async with controller.admit("holder", 1):
+                await release_holder.wait()
+
+        async def request(user):
+            async with controller.admit(user, 1):
+                order.append(user)
+                await asyncio.sleep(0)
+
+        tasks = [asyncio.create_task(holder())]
+        await asyncio.sleep(0)
+        # One user's batch queues first; later users must not wait behind all of it
+        for user in ("a", "a", "a", "b", "b", "c"):
+            tasks.append(asyncio.create_task(request(user)))
+            await asyncio.sleep(0)
+        assert controller.stats()["queued_requests"] == 6
+        release_holder.set()
+        await asyncio.gather(*tasks)
+        assert controller.stats()["inflight_generations"] == 0
+        return order
+
+    assert asyncio.run(scenario()) == ["a", "b", "c", "a", "b", "a"]
+
+
+def test_full_queue_sheds_load_with_retry_after():
+    from services.admission import AdmissionController, AdmissionRejected
+
+    async def scenario():
+        controller = AdmissionController(max_inflight=1, max_queue=1)
+        await controller.acquire("a", 1)
+        queued = asyncio.create_task(controller.acquire("b", 1))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("c", 1)
+        assert rejected.value.retry_after >= 1
+        assert rejected.value.queue_length == 1
+        controller.release(1, 0.1)
+        await queued
+
+    asyncio.run(scenario())
@@ -0,0 +1,216 @@
+# File: visual-god-app/backend/tests/test_bulk_ingest.py
+
+import asyncio
+import base64
+import io
+import socket
+import time
+import zipfile
+
+import httpx
+import pytest
+
+import fake_openai
+
+
+@pytest.fixture
+def bulk(api, tmp_path, monkeypatch):
+    from services import bulk_ingest
+    monkeypatch.setattr(bulk_ingest, "BULK_JOB_DIR", str(tmp_path))
+    return api.bulk_ingestor
+
+
+def make_archive(count: int) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for i in range(count):
+            archive.writestr(f"product_{i}.jpg", base64.b64decode(fake_openai.make_image_base64(512, 512, seed=i)))
+    return buffer.getvalue()
+
+
+def wait_for_job(client, job_id: str, timeout: float = 30.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        summary = client.get(f"/api/bulk/{job_id}").json()
+        if summary["status"] == "completed":
+            return summary
+        time.sleep(0.05)
+    raise AssertionError(f"Bulk job {job_id} did not finish: {summary}")
+
+
+def start_job(client, count: int = 2) -> str:
+    response = client.post(
+        "/api/bulk",
+        files={"archive": ("catalog.zip", make_archive(count), "application/zip")},
+        data={"userId": "user-1", "image_size": "facebook"}
+    )
+    assert response.status_code == 202, response.text
+    return response.json()["job_id"]
+
+
+def test_bulk_job_completes(client, bulk):
+    summary = wait_for_job(client, start_job(client))
+    assert summary["counts"]["completed"] == 2
+
+
+def test_resume_reprocesses_failed_items_from_checkpoint(client, bulk):
+    job_id = start_job(client)
+    wait_for_job(client, job_id)
+
+    # Simulate a restart after one product failed: only the checkpoint survives
+    job = bulk.jobs.pop(job_id)
+    job.items[0].update({"status": "failed", "error": "upstream timeout"})
+    job.status = "running"
+    job.checkpoint()
+
+    response = client.post(f"/api/bulk/{job_id}/resume")
+    assert response.status_code == 202, response.text
+    summary = wait_for_job(client, job_id)
+    assert summary["counts"]["completed"] == 2
+    assert summary["counts"]["failed"] == 0
+
+
+def test_validator_rejections_and_analysis_errors_are_reported_separately(client, bulk, monkeypatch):
+    not_a_product = '{"is_product": false, "category": "person", "confidence": 0.9, "description": "A person", ' \
+                    '"product_name": null, "product_type": null, "rejection_reason": "Contains a person"}'
+    monkeypatch.setattr(fake_openai, "VALIDATION_JSON", not_a_product)
+    rejected = wait_for_job(client, start_job(client, count=1))
+    assert rejected["counts"]["rejected"] == 1
+    item = client.get(f"/api/bulk/{rejected['job_id']}/manifest").json()["items"][0]
+    assert item["rejection_reason"] == "Contains a person"
+
+    monkeypatch.setattr(fake_openai, "VALIDATION_JSON", "not json")
+    failed = wait_for_job(client, start_job(client, count=1))
+    assert failed["counts"]["failed"] == 1
+    assert failed["counts"]["rejected"] == 0
+
+
+@pytest.fixture
+def fake_dns(monkeypatch):
+    from services import bulk_ingest
+    hosts = {"cdn.example.com": "93.184.216.34", "internal.example.com": "10.0.0.5", "localhost": "127.0.0.1"}
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        address = hosts.get(host, host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+
+    monkeypatch.setattr(bulk_ingest.socket, "getaddrinfo", getaddrinfo)
+    return hosts
+
+
+def fetch(url: str, handler) -> bytes:
+    from services.bulk_ingest import BulkIngestor
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            return await BulkIngestor._fetch_url(url, http)
+    return asyncio.run(run())
+
+
+def test_fetch_connects_to_the_checked_address(fake_dns):
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.host, request.headers["host"]))
+        return httpx.Response(200, content=b"image")
+
+    assert fetch("https://cdn.example.com/p.jpg", handler) == b"image"
+    assert seen == [("93.184.216.34", "cdn.example.com")]
+
+
+@pytest.mark.parametrize("url", [
+    "http://localhost:8000/api/metrics",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://internal.example.com/p.jpg",
+    "file:///etc/passwd",
+])
+def test_fetch_refuses_non_public_urls(fake_dns, url):
+    from services.bulk_ingest import UnsafeURLError
+    with pytest.raises(UnsafeURLError):
+        fetch(url, lambda request: httpx.Response(200, content=b"secret"))
+
+
+def test_fetch_rechecks_every_redirect_hop(fake_dns):
+    from services.bulk_ingest import UnsafeURLError
+
+    def handler(request):
+        return httpx.Response(302, headers={"Location": "http://internal.example.com/p.jpg"})
+
+    with pytest.raises(UnsafeURLError):
+        fetch("https://cdn.example.com/p.jpg", handler)
+
+
+def test_bulk_items_are_admitted_for_the_job_owner(client, bulk, api, monkeypatch):
+    admitted = []
+    acquire = api.admission.acquire
+
+    async def recording_acquire(user_id, cost):
+        admitted.append((user_id, cost))
+        return await acquire(user_id, cost)
+
+    monkeypatch.setattr(api.admission, "acquire", recording_acquire)
+    wait_for_job(client, start_job(client, count=2))
+    assert admitted == [("user-1", 1), ("user-1", 1)]
+
+
+def test_open_image_edit_circuit_degrades_items_until_resumed(client, bulk, monkeypatch):
+    from services.circuit_breaker import image_edit_breaker
+    with monkeypatch.context() as patch:
+        patch.setattr(image_edit_breaker, "is_open", lambda: True)
+        job_id = start_job(client, count=1)
+        wait_for_job(client, job_id)
+    item = client.get(f"/api/bulk/{job_id}/manifest").json()["items"][0]
+    assert item["degraded"] == "image_generation_unavailable"
+    assert item["outputs"] == []
+
+    client.post(f"/api/bulk/{job_id}/resume")
+    wait_for_job(client, job_id)
+    item = client.get(f"/api/bulk/{job_id}/manifest").json()["items"][0]
+    assert item["degraded"] is None
+    assert len(item["outputs"]) == 3
+
+
+def test_open_vision_circuit_fails_items(client, bulk, monkeypatch):
+    from services.circuit_breaker import CircuitOpenError, vision_breaker
+
+    def check():
+        raise CircuitOpenError("vision_validation", 30)
+
+    monkeypatch.setattr(vision_breaker, "check", check)
+    summary = wait_for_job(client, start_job(client, count=1))
+    assert summary["counts"]["failed"] == 1
+
+
+def test_fetch_aborts_oversized_downloads(fake_dns, monkeypatch):
+    from services import bulk_ingest
+    monkeypatch.setattr(bulk_ingest, "BULK_MAX_IMAGE_BYTES", 1024)
+
+    with pytest.raises(bulk_ingest.ImageTooLargeError):
+        fetch("https://cdn.example.com/p.jpg", lambda request: httpx.Response(200, content=b"x" * 4096))
+
+    async def body():
+        for _ in range(8):
+            yield b"x" * 512
+
+    def chunked(request):
+        # No Content-Length: the running cap has to stop it
+        return httpx.Response(200, content=body())
+
+    with pytest.raises(bulk_ingest.ImageTooLargeError):
+        fetch("https://cdn.example.com/p.jpg", chunked)
+
+
+def test_oversized_archive_members_fail_without_being_read(client, bulk, monkeypatch):
+    from services import bulk_ingest
+    monkeypatch.setattr(bulk_ingest, "BULK_MAX_IMAGE_BYTES", 4096)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        # Compresses to a few KB, inflates to 8MB
+        archive.writestr("bomb.jpg", b"\0" * (8 * 1024 * 1024))
+    response = client.post("/api/bulk", files={"archive": ("catalog.zip", buffer.getvalue(), "application/zip")},
+                           data={"userId": "user-1"})
+    summary = wait_for_job(client, response.json()["job_id"])
+
+    item = client.get(f"/api/bulk/{summary['job_id']}/manifest").json()["items"][0]
+    assert item["status"] == "failed"
+    assert "too large" in item["error"]
@@ -0,0 +1,148 @@
+# File: visual-god-app/backend/tests/test_content_agent.py
+
+import base64
+
+import fake_openai
+
+
+def product_image(seed: int = 0) -> dict:
+    return {"base64": fake_openai.make_image_base64(512, 512, seed=seed), "filename": f"product_{seed}.jpg"}
+
+
+def test_process_without_generation_returns_empty_image_list(api):
+    result = api.agent.process([product_image()], generate_images=False, image_size="facebook")
+
+    assert result["success"] is True
+    assert result["generated_images"] == []
+    assert len(result["products"]) == 1
+    assert len(result["prompts"]) == 3
+
+
+
+def test_generation_concurrency_matches_pipeline_mode():
+    from services.content_agent_helper import PIPELINE_GENERATION_WORKERS, generation_concurrency
+
+    assert generation_concurrency(15, "staged") == 1
+    assert generation_concurrency(15, "pipelined") == PIPELINE_GENERATION_WORKERS
+    assert generation_concurrency(1, "pipelined") == 1
+
+
+def test_native_canvases_cost_no_more_than_the_square_default():
+    from services.content_agent_helper import GENERATION_COST_USD, SIZE_MAPPING, plan_generation_size
+
+    square = GENERATION_COST_USD["auto"]["1024x1024"]
+    for platform in SIZE_MAPPING:
+        plan = plan_generation_size(platform)
+        assert plan["estimated_cost_usd"] is not None
+        assert plan["estimated_cost_usd"] <= square, platform
+
+
+def test_result_message_counts_resolved_styles(api):
+    alias = api.STYLE_REGISTRY["style_1"]["aliases"][0]
+    result = api.agent.process([product_image()], image_size="facebook", styles=[alias, "style_1"])
+
+    assert len(result["generated_images"]) == 1
+    assert "(1 style per product)" in result["message"]
+
+
+def test_structured_validation_requests_the_schema_and_counts_tokens(api):
+    from services import content_agent_helper, metrics
+    client = content_agent_helper.get_openai_client()
+    calls, prompt_tokens = metrics.get("validation.calls"), metrics.get("validation.prompt_tokens")
+
+    result, skipped = content_agent_helper.validate_single_image(client, product_image(), 0)
+
+    assert skipped is False
+    assert result["product_name"] == "Sparkling Water"
+    assert client.chat_requests[-1]["response_format"]["json_schema"]["name"] == "image_validation"
+    assert metrics.get("validation.calls") == calls + 1
+    assert metrics.get("validation.prompt_tokens") == prompt_tokens + 300
+
+
+def test_unparseable_validation_becomes_an_error_result(api, monkeypatch):
+    from services import content_agent_helper, metrics
+    monkeypatch.setattr(fake_openai, "VALIDATION_JSON", '{"is_product": true, "confid')
+    failures = metrics.get("validation.parse_failures")
+
+    result, _ = content_agent_helper.validate_single_image(content_agent_helper.get_openai_client(), product_image(), 0)
+
+    assert result["category"] == "error"
+    assert result["is_product"] is False
+    assert metrics.get("validation.parse_failures") == failures + 1
+
+
+def test_default_encoding_matches_the_legacy_jpeg_output():
+    import io
+
+    from PIL import Image
+    from services.image_encoding import encode_image
+
+    image = Image.open(io.BytesIO(base64.b64decode(fake_openai.make_image_base64(256, 256))))
+    legacy = io.BytesIO()
+    image.save(legacy, format="JPEG", quality=95, optimize=True)
+
+    assert encode_image(image) == legacy.getvalue()
+
+
+def scene_image(size: int, filename: str) -> dict:
+    """The same structured scene at any resolution, so rescaled copies are near-duplicates"""
+    import io
+
+    from PIL import Image, ImageDraw
+
+    image = Image.linear_gradient("L").convert("RGB").resize((size, size))
+    ImageDraw.Draw(image).ellipse((size // 4, size // 3, size * 3 // 4, size * 5 // 6), fill=(200, 40, 40))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return {"base64": base64.b64encode(buffer.getvalue()).decode("utf-8"), "filename": filename}
+
+
+def test_near_duplicates_are_kept_unless_the_request_opts_in(api):
+    images = [scene_image(512, "small.jpg"), scene_image(1024, "large.jpg")]
+
+    result = api.agent.process(images, generate_images=False, image_size="facebook")
+
+    assert result["duplicates_merged"] == []
+    assert len(result["products"]) == 2
+
+
+def test_near_duplicate_uploads_collapse_to_the_highest_resolution(api):
+    images = [scene_image(512, "small.jpg"), scene_image(1024, "large.jpg"), product_image(seed=3)]
+
+    result = api.agent.process(images, image_size="facebook", dedupe_threshold=8, styles=["style_1"])
+
+    assert len(result["duplicates_merged"]) == 1
+    group = result["duplicates_merged"][0]
+    assert (group["kept_index"], group["kept_filename"]) == (1, "large.jpg")
+    assert [m["index"] for m in group["merged"]] == [0]
+    assert len(result["products"]) == 2
+    assert sorted(img["input_image"] for img in result["generated_images"]) == ["large.jpg", "product_3.jpg"]
+
+
+def test_pipelined_output_matches_staged(api, monkeypatch):
+    from types import SimpleNamespace
+
+    from services import content_agent_helper
+    fake = content_agent_helper.get_openai_client()
+    renders = {}
+
+    def deterministic_edit(size: str = "1024x1024", **kwargs):
+        if size not in renders:
+            width, height = map(int, size.split("x"))
+            renders[size] = fake_openai.make_image_base64(width, height, "PNG")
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=renders[size])])
+
+    monkeypatch.setattr(fake.images, "edit", deterministic_edit)
+    images = [product_image(seed=1), product_image(seed=2)]
+
+    def run(mode):
+        result = api.agent.process(images, image_size="instagram", styles=["style_1", "style_3"], pipeline_mode=mode)
+        for img in result["generated_images"]:
+            img.pop("timings_ms", None)
+        return result
+
+    staged, pipelined = run("staged"), run("pipelined")
+
+    assert len(staged["generated_images"]) == 4
+    for key in ("success", "products", "prompts", "descriptions", "generated_images", "message"):
+        assert pipelined[key] == staged[key], key
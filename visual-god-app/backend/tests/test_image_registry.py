@@ -0,0 +1,37 @@
+# File: visual-god-app/backend/tests/test_image_registry.py
+
+import base64
+import gc
+
+import pytest
+
+from services import image_registry
+
+
+@pytest.fixture
+def spill_everything(monkeypatch):
+    monkeypatch.setattr(image_registry, "IMAGE_SPILL_THRESHOLD_BYTES", 0)
+
+
+def register(registry: image_registry.ImageRegistry) -> dict:
+    return registry.register(base64.b64encode(b"image bytes").decode("ascii"), "product.jpg", 0)
+
+
+def test_close_unmaps_readers_still_held(spill_everything):
+    registry = image_registry.ImageRegistry()
+    reader = image_registry.open_image_stream(register(registry))
+    assert reader.read() == b"image bytes"
+
+    registry.close()
+    assert reader.closed
+
+
+def test_dropped_readers_are_not_kept_mapped(spill_everything):
+    registry = image_registry.ImageRegistry()
+    ref = register(registry)
+    for _ in range(3):
+        image_registry.open_image_stream(ref).read()
+    gc.collect()
+
+    assert len(image_registry._lookup(ref["handle"])._maps) == 0
+    registry.close()
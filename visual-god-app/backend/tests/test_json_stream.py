@@ -0,0 +1,52 @@
+# File: visual-god-app/backend/tests/test_json_stream.py
+
+import json
+
+import pytest
+
+import fake_openai
+from services import json_stream
+
+PRODUCT_IMAGE = fake_openai.make_image_base64(512, 512)
+
+
+def strict_loads(body: bytes):
+    def reject(token):
+        raise ValueError(f"invalid JSON constant {token}")
+    return json.loads(body, parse_constant=reject)
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(json_stream, "orjson", None)
+    elif json_stream.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+@pytest.mark.parametrize("response_mode", ["full", "preview"])
+def test_streamed_process_body_matches_the_response_model(client, api, encoder, response_mode):
+    response = client.post("/api/process", json={
+        "images": [{"base64": PRODUCT_IMAGE, "filename": "product.jpg"}],
+        "userId": "user-1",
+        "image_size": "facebook",
+        "styles": ["style_1"],
+        "response_mode": response_mode
+    })
+
+    body = strict_loads(response.content)
+    assert body["success"] is True
+    assert len(body["generated_images"]) == 1
+    # Same keys and values the validated response_model path would emit, nulls included
+    assert api.ProcessResponse.model_validate(body).model_dump(mode="json") == body
+
+
+def test_non_finite_floats_are_written_as_null(encoder):
+    obj = {"success": True, "memory_profile": {"ratio": float("nan"), "peak": float("inf")},
+           "generated_images": [{"index": 0, "score": float("-inf"), "image_base64": "QUJD"}]}
+
+    body = strict_loads(b"".join(json_stream.iter_json(obj)))
+
+    assert body == {"success": True, "memory_profile": {"ratio": None, "peak": None},
+                    "generated_images": [{"index": 0, "score": None, "image_base64": "QUJD"}]}
@@ -0,0 +1,36 @@
+# File: visual-god-app/backend/tests/test_memory_profiler.py
+
+import pytest
+
+import fake_openai
+
+PRODUCT_IMAGE = fake_openai.make_image_base64(512, 512)
+
+
+@pytest.fixture
+def profiling_token(monkeypatch):
+    from services import memory_profiler
+    monkeypatch.setattr(memory_profiler, "MEMORY_PROFILING_TOKEN", "s3cret")
+    return "s3cret"
+
+
+def process(client, profile_header):
+    body = {"images": [{"base64": PRODUCT_IMAGE, "filename": "product.jpg"}], "userId": "user-1",
+            "generate_images": False, "image_size": "facebook"}
+    return client.post("/api/process", json=body, headers={"X-Profile-Memory": profile_header}).json()
+
+
+def test_clients_cannot_enable_profiling_without_a_configured_token(client):
+    assert process(client, "1")["memory_profile"] is None
+    assert client.get("/api/debug/memory").status_code == 404
+    assert client.get("/api/debug/memory", headers={"X-Debug-Token": ""}).status_code == 404
+
+
+def test_profiling_requires_the_token(client, profiling_token):
+    assert process(client, "1")["memory_profile"] is None
+    assert process(client, profiling_token)["memory_profile"]["label"] == "process"
+
+    assert client.get("/api/debug/memory", headers={"X-Debug-Token": "wrong"}).status_code == 404
+    response = client.get("/api/debug/memory", headers={"X-Debug-Token": profiling_token})
+    assert response.status_code == 200
+    assert response.json()["recent_profiles"][-1]["label"] == "process"
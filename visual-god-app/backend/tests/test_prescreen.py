@@ -0,0 +1,37 @@
+# File: visual-god-app/backend/tests/test_prescreen.py
+
+import base64
+import io
+
+from PIL import Image
+
+import fake_openai
+
+
+def solid_image(width: int, height: int) -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (240, 240, 240)).save(buffer, format="JPEG")
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+def test_prescreen_rejects_unusable_uploads_without_a_vision_call(api):
+    from services import content_agent_helper
+    fake = content_agent_helper.get_openai_client()
+    images = [
+        {"base64": solid_image(512, 512), "filename": "blank.jpg"},
+        {"base64": fake_openai.make_image_base64(64, 64), "filename": "tiny.jpg"},
+        {"base64": base64.b64encode(b"not an image").decode("ascii"), "filename": "broken.jpg"},
+        {"base64": fake_openai.make_image_base64(512, 512), "filename": "product.jpg"},
+    ]
+    chat_calls = len(fake.chat_requests)
+
+    result = api.agent.validate_images(images, compact=True)
+
+    # Only the real photo reaches the vision model
+    assert len(fake.chat_requests) - chat_calls == 1
+    assert result["api_calls_saved"] == 3
+    assert result["valid_products"] == [3]
+    reasons = {r["filename"]: r["rejection_reason"] for r in result["validation_results"]}
+    assert reasons["blank.jpg"] == "Image is blank or a solid colour"
+    assert reasons["tiny.jpg"].startswith("Image resolution is too low (64x64")
+    assert reasons["broken.jpg"] == "File is not a readable image"
@@ -0,0 +1,111 @@
+# File: visual-god-app/backend/tests/test_process_endpoint.py
+
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import fake_openai
+
+# Noise differs per call; retries must send byte-identical images
+PRODUCT_IMAGE = fake_openai.make_image_base64(512, 512)
+
+
+@pytest.fixture
+def open_image_edit_circuit():
+    from services.circuit_breaker import CLOSED, OPEN, image_edit_breaker
+    image_edit_breaker._transition(OPEN)
+    yield image_edit_breaker
+    image_edit_breaker._transition(CLOSED)
+
+
+def process(client, key=None, **overrides):
+    body = {
+        "images": [{"base64": PRODUCT_IMAGE, "filename": "product.jpg"}],
+        "userId": "user-1",
+        "image_size": "facebook",
+        "styles": ["style_1"],
+        **overrides
+    }
+    response = client.post("/api/process", json=body, headers={"Idempotency-Key": key} if key else {})
+    return response, json.loads(response.content)
+
+
+def test_open_image_edit_circuit_degrades_to_validation_only(client, open_image_edit_circuit):
+    response, result = process(client)
+
+    assert response.status_code == 200
+    assert result["success"] is True
+    assert result["degraded"] == "image_generation_unavailable"
+    assert len(result["products"]) == 1
+    assert len(result["prompts"]) == 1
+    assert result["generated_images"] == []
+
+
+def test_retry_after_degraded_run_generates_with_the_same_key(client, open_image_edit_circuit):
+    _, degraded = process(client, key="retry-after-degrade")
+    assert degraded["degraded"] == "image_generation_unavailable"
+
+    open_image_edit_circuit._transition("closed")
+    response, result = process(client, key="retry-after-degrade")
+    assert response.status_code == 200
+    assert result["degraded"] is None
+    assert len(result["generated_images"]) == 1
+
+
+def test_stored_result_is_replayed_while_circuits_are_open(client):
+    from services.circuit_breaker import CLOSED, OPEN, image_edit_breaker, vision_breaker
+    _, first = process(client, key="replay-while-open")
+    assert len(first["generated_images"]) == 1
+
+    image_edit_breaker._transition(OPEN)
+    vision_breaker._transition(OPEN)
+    try:
+        response, replayed = process(client, key="replay-while-open")
+    finally:
+        image_edit_breaker._transition(CLOSED)
+        vision_breaker._transition(CLOSED)
+    assert response.status_code == 200
+    assert response.headers["Idempotent-Replayed"] == "true"
+    assert replayed["degraded"] is None
+    assert len(replayed["generated_images"]) == 1
+
+
+def test_preview_mode_labels_the_preview_and_full_renditions(client):
+    response, result = process(client, response_mode="preview", output_format="webp", encode_preset="balanced")
+
+    image = result["generated_images"][0]
+    assert image["image_base64"] is None
+    assert base64.b64decode(image["preview_base64"])[:3] == b"\xff\xd8\xff"
+    assert image["preview_mime_type"] == "image/jpeg"
+    assert image["mime_type"] == "image/webp"
+    full = client.get(image["image_url"])
+    assert full.headers["content-type"] == "image/webp"
+
+
+def test_identical_concurrent_requests_share_one_upstream_run(client, monkeypatch):
+    from services import content_agent_helper
+    fake = content_agent_helper.get_openai_client()
+    edits = []
+    edit = fake.images.edit
+
+    def counting_edit(**kwargs):
+        edits.append(kwargs["size"])
+        return edit(**kwargs)
+
+    monkeypatch.setattr(fake.images, "edit", counting_edit)
+    # Long enough that the second request arrives while the first is still running
+    monkeypatch.setattr(fake, "vision_latency", 0.5)
+    chat_calls = len(fake.chat_requests)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = [r for _, r in pool.map(lambda _: process(client, userId="coalesce-user"), range(2))]
+
+    # One validation call and one edit: the same cost as a single request
+    assert len(fake.chat_requests) - chat_calls == 1
+    assert len(edits) == 1
+    assert sorted(bool(r["coalesced"]) for r in results) == [False, True]
+    first, second = ({k: v for k, v in r.items() if k != "coalesced"} for r in results)
+    assert first == second
+    assert len(first["generated_images"]) == 1
@@ -0,0 +1,19 @@
+# File: visual-god-app/backend/tests/test_styles.py
+
+import pytest
+
+from services.styles import STYLE_REGISTRY, resolve_styles
+
+
+def test_default_selects_every_style():
+    assert resolve_styles(None) == list(STYLE_REGISTRY.keys())
+
+
+def test_aliases_of_the_same_style_resolve_once_in_request_order():
+    alias = STYLE_REGISTRY["style_1"]["aliases"][0]
+    assert resolve_styles(["style_2", alias, "style_1", "style_2"]) == ["style_2", "style_1"]
+
+
+def test_unknown_style_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_styles(["watercolor"])
@@ -0,0 +1,18 @@
+# File: visual-god-app/backend/tests/test_tracing.py
+
+import json
+
+from services import tracing
+
+
+def test_file_export_rotates_past_the_size_cap(tmp_path, monkeypatch):
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(trace_file))
+    monkeypatch.setattr(tracing, "TRACE_FILE_MAX_BYTES", 100)
+    exporter = tracing.SpanExporter("file")
+
+    exporter.export([{"name": "first", "padding": "x" * 100}])
+    exporter.export([{"name": "second"}])
+
+    assert json.loads((tmp_path / "traces.jsonl.1").read_text())["name"] == "first"
+    assert json.loads(trace_file.read_text())["name"] == "second"
@@ -0,0 +1,51 @@
+# File: visual-god-app/backend/tests/test_validate_endpoint.py
+
+import fake_openai
+
+PRODUCT_IMAGE = fake_openai.make_image_base64(512, 512)
+
+
+def validate(client, **overrides):
+    body = {
+        "images": [{"base64": PRODUCT_IMAGE, "filename": "a.jpg"}, {"base64": PRODUCT_IMAGE, "filename": "b.jpg"}],
+        "userId": "user-1",
+        **overrides
+    }
+    response = client.post("/api/validate", json=body)
+    assert response.status_code == 200
+    return response, response.json()
+
+
+def test_full_mode_echoes_the_uploaded_images(client):
+    _, result = validate(client)
+
+    assert result["compact"] is False
+    assert [r["original_image"]["base64"] for r in result["validation_results"]] == [PRODUCT_IMAGE] * 2
+    assert result["valid_products"][0]["index"] == 0
+
+
+def test_compact_mode_refers_to_images_by_index_and_digest(client):
+    response, result = validate(client, compact=True)
+
+    assert PRODUCT_IMAGE not in response.text
+    assert result["compact"] is True
+    first, second = result["validation_results"]
+    assert (first["index"], first["filename"]) == (0, "a.jpg")
+    assert (second["index"], second["filename"]) == (1, "b.jpg")
+    assert first["digest"] and first["digest"] == second["digest"]
+    assert "original_image" not in first
+    assert result["valid_products"] == [0, 1]
+    assert result["rejected_images"] == []
+
+
+def test_fields_limit_each_result(client):
+    _, result = validate(client, fields="is_product, confidence")
+    assert [set(r) for r in result["validation_results"]] == [{"index", "is_product", "confidence"}] * 2
+
+    _, result = validate(client, compact=True, fields=["digest"])
+    assert [set(r) for r in result["validation_results"]] == [{"index", "digest"}] * 2
+
+
+def test_malformed_fields_are_rejected(client):
+    response = client.post("/api/validate", json={"images": [], "fields": {"is_product": True}})
+    assert response.status_code == 400
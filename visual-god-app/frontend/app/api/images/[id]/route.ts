@@ -0,0 +1,51 @@
+// File: visual-god-app/frontend/app/api/images/[id]/route.ts
+// Proxies full-resolution preview-mode renditions from the backend
+
+import { NextRequest, NextResponse } from 'next/server'
+import { createServerClient } from '@/lib/supabase/server'
+
+const BACKEND_URL = process.env.BACKEND_URL || 'https://visio-production-ec6a.up.railway.app'
+
+export async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  const supabase = await createServerClient()
+  const { data: { user } } = await supabase.auth.getUser()
+
+  if (!user) {
+    return NextResponse.json({
+      success: false,
+      error: 'Unauthorized'
+    }, { status: 401 })
+  }
+
+  const { id } = await params
+
+  let response: Response
+  try {
+    response = await fetch(`${BACKEND_URL}/api/images/${encodeURIComponent(id)}`, {
+      signal: AbortSignal.timeout(60000),
+    })
+  } catch (fetchError) {
+    console.error('Full image fetch error:', fetchError)
+    return NextResponse.json({
+      success: false,
+      error: 'Unable to reach the image service. Please try again.'
+    }, { status: 503 })
+  }
+
+  if (!response.ok) {
+    return NextResponse.json({
+      success: false,
+      error: response.status === 404 ? 'Image not found or expired' : `Image fetch failed (${response.status})`
+    }, { status: response.status === 404 ? 404 : 502 })
+  }
+
+  return new NextResponse(response.body, {
+    headers: {
+      'Content-Type': response.headers.get('Content-Type') || 'image/jpeg',
+      'Cache-Control': response.headers.get('Cache-Control') || 'private, max-age=3600',
+    }
+  })
+}
@@ -1,7 +1,7 @@
 // File: visual-god-app/frontend/app/api/process/route.ts
 // UPDATE your existing process route with better error handling
 
-import { NextRequest, NextResponse } from 'next/server'
+import { NextRequest, NextResponse, after } from 'next/server'
 import { createServerClient } from '@/lib/supabase/server'
 
 const BACKEND_URL = process.env.BACKEND_URL || 'https://visio-production-ec6a.up.railway.app'
@@ -9,13 +9,24 @@ const BACKEND_URL = process.env.BACKEND_URL || 'https://visio-production-ec6a.up
 // Type definitions
 interface GeneratedImage {
   prompt: string
-  image_base64: string
+  image_base64?: string
+  preview_base64?: string
+  image_id?: string
   image_url?: string
   index: number
   input_image?: string
   size?: string
   product_name?: string
   prompt_type?: string
+  mime_type?: string
+  preview_mime_type?: string
+}
+
+const EXTENSIONS: Record<string, string> = {
+  'image/jpeg': 'jpg',
+  'image/png': 'png',
+  'image/webp': 'webp',
+  'image/avif': 'avif',
 }
 
 interface UploadedImage extends GeneratedImage {
@@ -30,6 +41,122 @@ interface BackendResponse {
   [key: string]: any
 }
 
+interface StylesResponse {
+  styles: Record<string, { aliases: string[] }>
+  default_styles: string[]
+}
+
+// Number of distinct styles the backend will render: aliases resolve to their style id
+async function countRenderedStyles(styles: unknown): Promise<number> {
+  const requested = Array.isArray(styles) && styles.length > 0 ? styles.map(String) : null
+  try {
+    const response = await fetch(`${BACKEND_URL}/api/styles`)
+    if (!response.ok) {
+      throw new Error(`Styles lookup failed (${response.status})`)
+    }
+    const registry: StylesResponse = await response.json()
+    if (!requested) {
+      return registry.default_styles.length
+    }
+    const lookup = new Map<string, string>()
+    for (const [styleId, style] of Object.entries(registry.styles)) {
+      lookup.set(styleId, styleId)
+      for (const alias of style.aliases) {
+        lookup.set(alias, styleId)
+      }
+    }
+    // Unknown names are rejected by the backend; count them so the check never undercharges
+    return new Set(requested.map(name => lookup.get(name) ?? name)).size
+  } catch (error) {
+    console.error('Style registry unavailable, counting requested styles as given:', error)
+    return requested ? new Set(requested).size : 3
+  }
+}
+
+// Upload one generated image to Supabase Storage and record it in generated_images
+async function persistImage(
+  supabase: Awaited<ReturnType<typeof createServerClient>>,
+  userId: string,
+  sessionId: string,
+  imageSize: string,
+  img: GeneratedImage,
+  index: number,
+  imageBuffer: Buffer,
+  idempotencyKey: string | null
+): Promise<UploadedImage> {
+  // Generate filename with product and style info
+  const productName = img.product_name?.replace(/\s+/g, '-').toLowerCase() || 'product'
+  const styleType = img.prompt_type || `style-${(index % 3) + 1}`
+  const timestamp = Date.now()
+  const mimeType = img.mime_type || 'image/jpeg'
+  const filename = `${productName}-${styleType}-${timestamp}.${EXTENSIONS[mimeType] || 'jpg'}`
+  const filePath = `${userId}/${sessionId}/${filename}`
+  
+  // Upload to Supabase Storage
+  const { error: uploadError } = await supabase.storage
+    .from('generated-images')
+    .upload(filePath, imageBuffer, {
+      contentType: mimeType,
+      cacheControl: '3600',
+      upsert: false
+    })
+
+  if (uploadError) {
+    console.error('Upload error:', uploadError)
+    throw uploadError
+  }
+
+  // Get public URL
+  const { data: urlData } = supabase.storage
+    .from('generated-images')
+    .getPublicUrl(filePath)
+
+  // Save to database with storage path
+  const { data: dbData, error: dbError } = await supabase
+    .from('generated_images')
+    .insert({
+      session_id: sessionId,
+      user_id: userId,
+      filename: filename,
+      file_path: filePath,
+      file_size: imageBuffer.length,
+      mime_type: mimeType,
+      prompt_text: img.prompt,
+      prompt_index: index,
+      platform: imageSize,
+      size: img.size,
+      metadata: { 
+        public_url: urlData.publicUrl,
+        storage_path: filePath,
+        original_filename: filename,
+        product_name: img.product_name,
+        prompt_type: img.prompt_type,
+        // Lets a replayed response find the rows its first attempt created
+        idempotency_key: idempotencyKey,
+        base64: img.image_base64 || imageBuffer.toString('base64') // Keep base64 as fallback
+      }
+    })
+    .select()
+    .single()
+
+  if (dbError) {
+    console.error('Database error:', dbError)
+    // If database insert fails, clean up uploaded file
+    await supabase.storage
+      .from('generated-images')
+      .remove([filePath])
+    throw dbError
+  }
+
+  console.log(`✅ Uploaded image ${index + 1} to: ${filePath}`)
+
+  return {
+    ...img,
+    storage_url: urlData.publicUrl,
+    database_id: dbData.id
+  }
+}
+
 export async function POST(request: NextRequest) {
   try {
     const supabase = await createServerClient()
@@ -43,10 +170,10 @@ export async function POST(request: NextRequest) {
     }
 
     const body = await request.json()
-    const { images, generate_images, image_size, sessionId } = body
+    const { images, generate_images, image_size, sessionId, output_format, encode_preset, response_mode, styles } = body
     
-    // Updated credit calculation for product-only workflow (3 images per product)
-    const requiredCredits = generate_images ? (images.length * 3) : 0
+    // One credit per generated image: one per distinct rendered style (every style by default) for each product
+    const requiredCredits = generate_images ? (images.length * await countRenderedStyles(styles)) : 0
     
     // Check user credits
     const { data: canProceed } = await supabase.rpc('check_user_credits', {
@@ -64,24 +191,42 @@ export async function POST(request: NextRequest) {
     // Call your Railway backend with better error handling
     let response: Response
     
+    // Forward the client's Idempotency-Key so backend retries replay the stored result
+    const backendHeaders: Record<string, string> = {
+      'Content-Type': 'application/json',
+    }
+    const idempotencyKey = request.headers.get('Idempotency-Key')
+    if (idempotencyKey) {
+      backendHeaders['Idempotency-Key'] = idempotencyKey
+    }
+    // One trace id per request so backend spans can be matched to this call
+    const traceparent = request.headers.get('traceparent')
+    if (traceparent) {
+      backendHeaders['traceparent'] = traceparent
+    }
+    const traceId = request.headers.get('X-Trace-Id') || crypto.randomUUID().replace(/-/g, '')
+    backendHeaders['X-Trace-Id'] = traceId
+
     try {
       response = await fetch(`${BACKEND_URL}/api/process`, {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
+        headers: backendHeaders,
         body: JSON.stringify({
           images,
           userId: user.id,
           sessionId,
           generate_images,
-          image_size
+          image_size,
+          output_format,
+          encode_preset,
+          response_mode,
+          styles
         }),
         // Add timeout and retry logic
         signal: AbortSignal.timeout(300000), // 5 minutes timeout
       })
     } catch (fetchError: any) {
-      console.error('Backend fetch error:', fetchError)
+      console.error(`Backend fetch error (trace ${traceId}):`, fetchError)
       
       // Handle specific fetch errors
       if (fetchError.name === 'AbortError' || fetchError.message.includes('timeout')) {
@@ -106,12 +251,16 @@ export async function POST(request: NextRequest) {
 
     // Handle HTTP errors
     if (!response.ok) {
+      console.error(`Backend returned ${response.status} (trace ${traceId})`)
       let errorMessage = 'Processing failed'
       
       if (response.status === 413) {
         errorMessage = 'Images are too large. Please use smaller images (under 4MB each).'
       } else if (response.status === 429) {
-        errorMessage = 'Too many requests. Please wait a moment and try again.'
+        const retryAfter = response.headers.get('Retry-After')
+        errorMessage = retryAfter
+          ? `The service is busy. Please try again in about ${retryAfter} seconds.`
+          : 'Too many requests. Please wait a moment and try again.'
       } else if (response.status === 500) {
         errorMessage = 'Server error occurred. This might be due to high traffic. Please try again in a few moments.'
       } else if (response.status === 502 || response.status === 503) {
@@ -122,10 +271,14 @@ export async function POST(request: NextRequest) {
         errorMessage = `Processing error (${response.status}). Please try again.`
       }
       
+      const retryAfterHeader = response.headers.get('Retry-After')
       return NextResponse.json({
         success: false,
         error: errorMessage
-      }, { status: response.status })
+      }, {
+        status: response.status,
+        headers: retryAfterHeader ? { 'Retry-After': retryAfterHeader } : undefined
+      })
     }
 
     let data: BackendResponse
@@ -140,104 +293,88 @@ export async function POST(request: NextRequest) {
       }, { status: 502 })
     }
     
-    // Save generated images to Supabase Storage and database if successful
-    if (data.success && data.generated_images && sessionId) {
+    // A replayed response was already stored by the attempt that produced it;
+    // point at those rows instead of uploading and inserting duplicates
+    const replayed = response.headers.get('Idempotent-Replayed') === 'true'
+    if (replayed && idempotencyKey && data.success && data.generated_images && sessionId) {
+      const { data: storedRows, error: lookupError } = await supabase
+        .from('generated_images')
+        .select('id, prompt_index, metadata')
+        .eq('session_id', sessionId)
+        .eq('user_id', user.id)
+        .eq('metadata->>idempotency_key', idempotencyKey)
+
+      if (lookupError) {
+        console.error('Stored image lookup error:', lookupError)
+      }
+
+      data.generated_images = data.generated_images.map((img, index) => {
+        const row = storedRows?.find(r => r.prompt_index === index)
+        const metadata = row?.metadata as { public_url?: string } | null
+        return {
+          ...img,
+          image_url: img.image_id ? `/api/images/${img.image_id}` : img.image_url,
+          storage_url: metadata?.public_url || null,
+          database_id: row?.id || null
+        }
+      })
+
+      console.log(`♻️ Replayed response: reused ${storedRows?.length || 0} stored image(s) for session ${sessionId}`)
+    } else if (data.success && data.generated_images && sessionId) {
       const uploadedImages: UploadedImage[] = []
+      // Preview-mode images carry no full-resolution bytes; they are persisted after responding
+      const deferredImages: { img: GeneratedImage, index: number }[] = []
       
       for (const [index, img] of data.generated_images.entries()) {
+        if (!img.image_base64 && img.image_id) {
+          deferredImages.push({ img, index })
+          continue
+        }
         try {
-          // Convert base64 to buffer
-          const base64Data = img.image_base64
-          const imageBuffer = Buffer.from(base64Data, 'base64')
-          
-          // Generate filename with product and style info
-          const productName = img.product_name?.replace(/\s+/g, '-').toLowerCase() || 'product'
-          const styleType = img.prompt_type || `style-${(index % 3) + 1}`
-          const timestamp = Date.now()
-          const filename = `${productName}-${styleType}-${timestamp}.jpg`
-          const filePath = `${user.id}/${sessionId}/${filename}`
-          
-          // Upload to Supabase Storage
-          const { data: uploadData, error: uploadError } = await supabase.storage
-            .from('generated-images')
-            .upload(filePath, imageBuffer, {
-              contentType: 'image/jpeg',
-              cacheControl: '3600',
-              upsert: false
-            })
-
-          if (uploadError) {
-            console.error('Upload error:', uploadError)
-            throw uploadError
-          }
-
-          // Get public URL
-          const { data: urlData } = supabase.storage
-            .from('generated-images')
-            .getPublicUrl(filePath)
-
-          // Save to database with storage path
-          const { data: dbData, error: dbError } = await supabase
-            .from('generated_images')
-            .insert({
-              session_id: sessionId,
-              user_id: user.id,
-              filename: filename,
-              file_path: filePath,
-              file_size: imageBuffer.length,
-              mime_type: 'image/jpeg',
-              prompt_text: img.prompt,
-              prompt_index: index,
-              platform: image_size,
-              size: img.size,
-              metadata: { 
-                public_url: urlData.publicUrl,
-                storage_path: filePath,
-                original_filename: filename,
-                product_name: img.product_name,
-                prompt_type: img.prompt_type,
-                base64: img.image_base64 // Keep base64 as fallback
-              }
-            })
-            .select()
-            .single()
-
-          if (dbError) {
-            console.error('Database error:', dbError)
-            // If database insert fails, clean up uploaded file
-            await supabase.storage
-              .from('generated-images')
-              .remove([filePath])
-            throw dbError
-          }
-
-          const uploadedImage: UploadedImage = {
-            ...img,
-            storage_url: urlData.publicUrl,
-            database_id: dbData.id
+          if (!img.image_base64) {
+            throw new Error('Generated image has no data')
           }
-          
-          uploadedImages.push(uploadedImage)
-
-          console.log(`✅ Uploaded image ${index + 1} to: ${filePath}`)
-
+          const imageBuffer = Buffer.from(img.image_base64, 'base64')
+          uploadedImages.push(await persistImage(supabase, user.id, sessionId, image_size, img, index, imageBuffer, idempotencyKey))
         } catch (error) {
           console.error(`❌ Failed to upload image ${index + 1}:`, error)
           // Continue with other images even if one fails
         }
       }
 
+      if (deferredImages.length > 0) {
+        after(async () => {
+          let persisted = 0
+          for (const { img, index } of deferredImages) {
+            try {
+              const fullResponse = await fetch(`${BACKEND_URL}/api/images/${img.image_id}`)
+              if (!fullResponse.ok) {
+                throw new Error(`Full image fetch failed (${fullResponse.status})`)
+              }
+              const imageBuffer = Buffer.from(await fullResponse.arrayBuffer())
+              await persistImage(supabase, user.id, sessionId, image_size, img, index, imageBuffer, idempotencyKey)
+              persisted++
+            } catch (error) {
+              console.error(`❌ Failed to persist full image ${index + 1}:`, error)
+            }
+          }
+          console.log(`✅ Persisted ${persisted}/${deferredImages.length} full-resolution images in the background`)
+        })
+      }
+
       // Update the response with storage URLs
       data.generated_images = data.generated_images.map((img, index) => {
         const uploaded = uploadedImages.find(u => u.index === img.index)
         return {
           ...img,
+          // The backend's image_url is relative to the backend; serve it through our proxy instead
+          image_url: img.image_id ? `/api/images/${img.image_id}` : img.image_url,
           storage_url: uploaded?.storage_url || null,
           database_id: uploaded?.database_id || null
         }
       })
 
-      console.log(`✅ Successfully uploaded ${uploadedImages.length}/${data.generated_images.length} images to storage`)
+      console.log(`✅ Successfully uploaded ${uploadedImages.length}/${data.generated_images.length - deferredImages.length} images to storage`)
     }
 
     return NextResponse.json(data)
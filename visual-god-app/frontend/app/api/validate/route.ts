@@ -18,7 +18,7 @@ export async function POST(request: NextRequest) {
     }
 
     const body = await request.json()
-    const { images } = body
+    const { images, compact, fields } = body
     
     if (!images || images.length === 0) {
       return NextResponse.json({
@@ -35,7 +35,9 @@ export async function POST(request: NextRequest) {
       },
       body: JSON.stringify({
         images,
-        userId: user.id
+        userId: user.id,
+        compact,
+        fields
       }),
     })
 
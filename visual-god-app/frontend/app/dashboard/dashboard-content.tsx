@@ -11,13 +11,31 @@ import Link from 'next/link'
 
 interface GeneratedImage {
   prompt: string
-  image_base64: string
-  image_url?: string
+  image_base64?: string | null  // Full rendition; null in preview mode
+  preview_base64?: string | null
+  image_url?: string | null  // Full rendition served through /api/images/{id}
   index: number
   input_image?: string
   size?: string
   product_name?: string
   prompt_type?: string
+  mime_type?: string | null
+  preview_mime_type?: string | null
+}
+
+// Thumbnail if the backend sent one, otherwise the full rendition
+const displaySrc = (image: GeneratedImage) => {
+  if (image.preview_base64) {
+    return `data:${image.preview_mime_type || 'image/jpeg'};base64,${image.preview_base64}`
+  }
+  return fullImageHref(image)
+}
+
+const fullImageHref = (image: GeneratedImage) => {
+  if (image.image_base64) {
+    return `data:${image.mime_type || 'image/jpeg'};base64,${image.image_base64}`
+  }
+  return image.image_url || ''
 }
 
 interface ValidationResult {
@@ -28,7 +46,7 @@ interface ValidationResult {
   product_name?: string
   product_type?: string
   rejection_reason?: string
-  original_image: any
+  original_image?: any
   index: number
 }
 
@@ -89,6 +107,15 @@ const LOADING_MESSAGES = [
   "🚀 Almost there, preparing your visuals..."
 ]
 
+// Transient failures of /api/process are retried with the same Idempotency-Key
+const PROCESS_MAX_ATTEMPTS = 3
+const RETRYABLE_STATUSES = new Set([429, 502, 503, 504])
+
+const retryDelayMs = (attempt: number, retryAfter: string | null) => {
+  const seconds = retryAfter ? Number(retryAfter) : NaN
+  return Number.isFinite(seconds) ? seconds * 1000 : 1000 * 2 ** (attempt - 1)
+}
+
 interface DashboardContentProps {
   profile: any
   stats: any
@@ -113,10 +140,18 @@ export function DashboardContent({ profile, stats }: DashboardContentProps) {
   const [canProceed, setCanProceed] = useState(false)
   
   const abortControllerRef = useRef<AbortController | null>(null)
+  // Idempotency-Key of the submission in progress; kept across retries and
+  // resubmits until it succeeds so the backend replays instead of regenerating
+  const idempotencyKeyRef = useRef<string | null>(null)
   
   const router = useRouter()
   const supabase = createClient()
 
+  // Different inputs make a different submission
+  useEffect(() => {
+    idempotencyKeyRef.current = null
+  }, [files, generateImages, selectedSize])
+
   const creditsRemaining = stats?.credits_remaining || 0
   const validProducts = validationResults.filter(r => r.is_product && r.confidence > 0.7)
   const requiredCredits = generateImages ? validProducts.length * 3 : 0
@@ -282,7 +317,12 @@ export function DashboardContent({ profile, stats }: DashboardContentProps) {
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ images })
+        // Compact mode: no echoed base64, only the fields rendered below
+        body: JSON.stringify({
+          images,
+          compact: true,
+          fields: ['is_product', 'category', 'confidence', 'description', 'product_name', 'rejection_reason']
+        })
       })
 
       const data = await response.json()
@@ -307,8 +347,10 @@ export function DashboardContent({ profile, stats }: DashboardContentProps) {
   const downloadImage = (image: GeneratedImage) => {
     const sizeConfig = IMAGE_SIZES[selectedSize]
     const link = document.createElement('a')
-    link.href = `data:image/jpeg;base64,${image.image_base64}`
-    link.download = `visual-god-${sizeConfig.label.toLowerCase().replace(/\s+/g, '-')}-${image.product_name?.toLowerCase().replace(/\s+/g, '-') || 'product'}-${image.prompt_type || image.index + 1}.jpg`
+    const mimeType = image.mime_type || 'image/jpeg'
+    const extension = mimeType === 'image/jpeg' ? 'jpg' : mimeType.split('/')[1]
+    link.href = fullImageHref(image)
+    link.download = `visual-god-${sizeConfig.label.toLowerCase().replace(/\s+/g, '-')}-${image.product_name?.toLowerCase().replace(/\s+/g, '-') || 'product'}-${image.prompt_type || image.index + 1}.${extension}`
     document.body.appendChild(link)
     link.click()
     document.body.removeChild(link)
@@ -357,20 +399,43 @@ export function DashboardContent({ profile, stats }: DashboardContentProps) {
       setUploadProgress(40)
 
       setProcessingStep('Processing with AI...')
-      const response = await fetch('/api/process', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          images,
-          userId: profile.id,
-          generate_images: generateImages,
-          image_size: selectedSize
-        }),
-        signal: abortControllerRef.current.signal
+      // One key per submission; retries of this same submission replay the first result
+      if (!idempotencyKeyRef.current) {
+        idempotencyKeyRef.current = crypto.randomUUID()
+      }
+      const idempotencyKey = idempotencyKeyRef.current
+      const body = JSON.stringify({
+        images,
+        userId: profile.id,
+        generate_images: generateImages,
+        image_size: selectedSize,
+        // Thumbnails inline; full renditions load from image_url on download
+        response_mode: 'preview'
       })
 
+      let response: Response
+      for (let attempt = 1; ; attempt++) {
+        try {
+          response = await fetch('/api/process', {
+            method: 'POST',
+            headers: {
+              'Content-Type': 'application/json',
+              'Idempotency-Key': idempotencyKey,
+            },
+            body,
+            signal: abortControllerRef.current?.signal
+          })
+        } catch (error: any) {
+          if (error.name === 'AbortError' || attempt >= PROCESS_MAX_ATTEMPTS) throw error
+          await new Promise(resolve => setTimeout(resolve, retryDelayMs(attempt, null)))
+          continue
+        }
+        if (!RETRYABLE_STATUSES.has(response.status) || attempt >= PROCESS_MAX_ATTEMPTS) break
+        setProcessingStep(`Service busy, retrying (${attempt}/${PROCESS_MAX_ATTEMPTS - 1})...`)
+        await new Promise(resolve => setTimeout(resolve, retryDelayMs(attempt, response.headers.get('Retry-After'))))
+        if (abortControllerRef.current?.signal.aborted) return
+      }
+
       setUploadProgress(70)
 
       if (!response.ok) {
@@ -384,6 +449,9 @@ export function DashboardContent({ profile, stats }: DashboardContentProps) {
       
       if (cancelRequested) return
       
+      if (data.success) {
+        idempotencyKeyRef.current = null
+      }
       setUploadProgress(100)
       setResult(data)
       router.refresh()
@@ -588,7 +656,7 @@ export function DashboardContent({ profile, stats }: DashboardContentProps) {
                                   'aspect-[16/9]'
                                 }`}>
                                   <img
-                                    src={`data:image/jpeg;base64,${image.image_base64}`}
+                                    src={displaySrc(image)}
                                     alt={`${image.product_name} - ${image.prompt_type}`}
                                     className="w-full h-full object-cover"
                                   />
@@ -25,6 +25,7 @@ export default async function HistoryPage() {
         prompt_text,
         platform,
         size,
+        mime_type,
         created_at,
         metadata
       )
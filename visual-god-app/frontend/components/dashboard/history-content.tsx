@@ -13,6 +13,7 @@ interface GeneratedImage {
   prompt_text: string
   platform: string
   size: string
+  mime_type?: string
   created_at: string
   metadata?: {
     base64?: string
@@ -56,7 +57,7 @@ export function HistoryContent({ sessions, user }: HistoryContentProps) {
       // Try different image sources in order of preference
       if (imageData.metadata?.base64) {
         // Use base64 from metadata
-        imageUrl = `data:image/jpeg;base64,${imageData.metadata.base64}`
+        imageUrl = `data:${imageData.mime_type || 'image/jpeg'};base64,${imageData.metadata.base64}`
       } else if (imageData.metadata?.public_url) {
         // Use public URL if available
         imageUrl = imageData.metadata.public_url
@@ -88,7 +89,7 @@ export function HistoryContent({ sessions, user }: HistoryContentProps) {
 
     // Try different image sources
     if (image.metadata?.base64) {
-      return `data:image/jpeg;base64,${image.metadata.base64}`
+      return `data:${image.mime_type || 'image/jpeg'};base64,${image.metadata.base64}`
     } else if (image.metadata?.public_url) {
       return image.metadata.public_url
     }